@@ -13,21 +13,20 @@ def display_ultra_clean_head_tail():
 
     file_path = os.path.join("data", "owid-covid-data.csv")
 
+    # A minimal, core set of columns guaranteed to fit on one line.
+    core_columns = [
+        'location', 'date', 'total_cases', 'new_cases', 'total_deaths', 'new_deaths'
+    ]
+
     try:
         print(f"[*] Loading dataset from: {file_path}...")
-        df = pd.read_csv(file_path)
+        # Only the core columns are parsed, not the full OWID schema
+        df_core = pd.read_csv(file_path, usecols=core_columns)[core_columns]
         print("[OK] Dataset loaded successfully.")
     except FileNotFoundError:
         print(f"[ERROR] The file was not found at: {file_path}")
         return
 
-    # A minimal, core set of columns guaranteed to fit on one line.
-    core_columns = [
-        'location', 'date', 'total_cases', 'new_cases', 'total_deaths', 'new_deaths'
-    ]
-    
-    df_core = df[core_columns]
-
     print("\n" + "-" * 35)
     print("  First 5 Rows (Core Columns)")
     print("-" * 35)
@@ -15,29 +15,188 @@ ACTIVITY 1 REQUIREMENTS (Project Brief):
 5. Convert 'date' column to datetime
 
 OUTPUTS:
-- Cleaned dataset (covid_data_cleaned.csv) 
+- Cleaned dataset (covid_data_cleaned.parquet, or .csv without pyarrow)
 - 2 exploration visualizations (activity1_images/)
 - Missing value analysis and data overview
 
-USAGE: python activities/activity-1/activity-1.py
+USAGE: python activities/activity-1/activity-1.py [--csv] [--compact] [--chunksize N]
+       --csv also exports covid_data_cleaned.csv next to the Parquet file
+       --compact keeps metrics as int32/float32 and strings as categoricals where lossless
+       --chunksize N streams the CSV N rows at a time (bounded memory, see common.ingest)
 
 NOTE: This activity ONLY cleans structure and explores data.
       Missing value IMPUTATION is handled in Activity 2.
       
 DATA FLOW: 
-data/owid-covid-data.csv → Activity 1 → covid_data_cleaned.csv → Activity 2
+data/owid-covid-data.csv → Activity 1 → covid_data_cleaned → Activity 2
 ================================================================================
 """
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import charts, compact, ingest, profiling, settings, store
+
+plt = charts.lazy_import('matplotlib.pyplot')
+
+def plot_exploration(missing_summary, location_counts, daily_records):
+    """Missing value overview and timeline charts (location_counts and
+    daily_records are record counts per location and per date)"""
+    with profiling.stage('plots'):
+        # Visualization 1: Missing values overview
+        plt.figure(figsize=(15, 10))
+
+        # Top subplot: Bar chart of missing percentages
+        plt.subplot(2, 1, 1)
+        top_15_missing = missing_summary.head(15)
+        bars = plt.bar(range(len(top_15_missing)), top_15_missing['Missing_Percentage'], 
+                       color=['red' if x > 90 else 'orange' if x > 50 else 'yellow' if x > 10 else 'green' 
+                              for x in top_15_missing['Missing_Percentage']])
+        plt.title('Missing Value Analysis - Top 15 Columns', fontsize=14, fontweight='bold')
+        plt.xlabel('Columns')
+        plt.ylabel('Missing Percentage (%)')
+        plt.xticks(range(len(top_15_missing)), top_15_missing['Column'], rotation=45, ha='right')
+
+        # Add percentage labels
+        for bar, pct in zip(bars, top_15_missing['Missing_Percentage']):
+            plt.text(bar.get_x() + bar.get_width()/2., bar.get_height() + 1,
+                    f'{pct:.1f}%', ha='center', va='bottom', fontsize=9)
+
+        # Add 90% threshold line
+        plt.axhline(y=90, color='red', linestyle='--', alpha=0.8, label='90% Threshold (Drop Line)')
+        plt.legend()
+        plt.grid(True, alpha=0.3)
+
+        # Bottom subplot: Data coverage by location
+        plt.subplot(2, 1, 2)
+        location_counts = location_counts.head(15)
+        plt.bar(range(len(location_counts)), location_counts.values, color='steelblue', alpha=0.8)
+        plt.title('Data Coverage - Top 15 Locations by Record Count', fontsize=14, fontweight='bold')
+        plt.xlabel('Countries/Regions')
+        plt.ylabel('Number of Records')
+        plt.xticks(range(len(location_counts)), location_counts.index, rotation=45, ha='right')
+
+        # Add value labels
+        for i, v in enumerate(location_counts.values):
+            plt.text(i, v + 20, str(v), ha='center', va='bottom', fontsize=9)
+
+        plt.tight_layout()
+        charts.save_figure('activity1_images/1_data_exploration_overview.png')
+        plt.close()
+        print("[OK] Saved: data_exploration_overview.png")
+
+        # Visualization 2: Dataset timeline
+        plt.figure(figsize=(12, 6))
+        plt.plot(daily_records.index, daily_records.values, linewidth=2, color='darkblue')
+        plt.title('Daily Record Count Over Time', fontsize=14, fontweight='bold')
+        plt.xlabel('Date')
+        plt.ylabel('Number of Records per Day')
+        plt.grid(True, alpha=0.3)
+        plt.xticks(rotation=45)
+        plt.tight_layout()
+        charts.save_figure('activity1_images/2_dataset_timeline.png')
+        plt.close()
+        print("[OK] Saved: dataset_timeline.png")
+
+def main_streaming(chunksize):
+    """
+    Activity 1 over a CSV read in chunks of chunksize rows (--chunksize).
+    Produces the same report, figures and cleaned dataset as main() with
+    bounded memory; returns None, so Activity 2 reads the cleaned dataset
+    from the store.
+    """
+    print("\n1. STREAMING DATASET FROM /data DIRECTORY")
+    print("-" * 50)
+    with profiling.stage('scan'):
+        try:
+            profile = ingest.scan("data/owid-covid-data.csv", chunksize)
+        except FileNotFoundError:
+            print("[ERROR] data/owid-covid-data.csv not found!")
+            return
+    print(f"[OK] Dataset scanned in chunks of {chunksize:,} rows from data/owid-covid-data.csv")
+    print(f"[OK] Original Shape: {profile.rows:,} rows, {len(profile.columns)} columns")
+    if settings.compact_dtypes():
+        print("[SKIP] --compact is not applied while streaming (Activity 2 compacts the dataset)")
+
+    # 2. Show first and last 5 rows
+    print("\n2. DISPLAYING FIRST AND LAST 5 ROWS")
+    print("-" * 50)
+    print("\nFIRST 5 ROWS:")
+    print(profile.head.to_string())
+    print("\nLAST 5 ROWS:")
+    print(profile.tail.to_string())
+
+    daily_records = profile.daily_records()
+    print(f"\nDATASET OVERVIEW:")
+    print(f"- Date range: {daily_records.index.min():%Y-%m-%d} to {daily_records.index.max():%Y-%m-%d}")
+    print(f"- Countries/Regions: {len(profile.location_counts)}")
+    print(f"- Total records: {profile.rows:,}")
+
+    # 3. Missing values, accumulated over the chunks
+    print("\n3. CHECKING FOR MISSING VALUES")
+    print("-" * 50)
+    missing_summary = profile.missing_summary()
+    total_missing = int(profile.missing.sum())
+    print(f"MISSING VALUES ANALYSIS:")
+    print(f"- Total missing values: {total_missing:,}")
+    print(f"- Columns with missing data: {(profile.missing > 0).sum()}/{len(profile.columns)}")
+    print(f"- Dataset completeness: {((1 - total_missing/(profile.rows*len(profile.columns)))*100):.1f}%")
+
+    print(f"\nTOP 10 COLUMNS WITH MOST MISSING VALUES:")
+    for _, row in missing_summary.head(10).iterrows():
+        print(f"- {row['Column']}: {row['Missing_Count']:,} ({row['Missing_Percentage']:.1f}%)")
+
+    # 4. Drop columns with >90% missing values
+    print("\nDROPPING COLUMNS WITH >90% MISSING VALUES")
+    print("-" * 50)
+    cols_to_drop = profile.drop_columns()
+    print(f"COLUMNS TO BE DROPPED ({len(cols_to_drop)} columns):")
+    if cols_to_drop:
+        for col in cols_to_drop:
+            pct = missing_summary[missing_summary['Column'] == col]['Missing_Percentage'].iloc[0]
+            print(f"- {col}: {pct:.1f}% missing")
+    else:
+        print("- No columns have >90% missing data")
+
+    # 5. Dates are parsed as each chunk is written
+    print("\nCONVERTING DATE COLUMN TO DATETIME")
+    print("-" * 50)
+    print(f"DATE RANGE: {daily_records.index.min()} to {daily_records.index.max()}")
+    print(f"TOTAL DAYS: {(daily_records.index.max() - daily_records.index.min()).days}")
+
+    print("\nCREATING EXPLORATION VISUALIZATIONS")
+    print("-" * 50)
+    if charts.enabled():
+        plot_exploration(missing_summary, profile.location_counts, daily_records)
+
+    # Second pass: write the cleaned dataset chunk by chunk
+    with profiling.stage('save'):
+        output_file = ingest.write_cleaned("data/owid-covid-data.csv", profile, cols_to_drop, chunksize)
+    file_size_mb = os.path.getsize(output_file) / (1024 * 1024)
+    kept_columns = len(profile.columns) - len(cols_to_drop)
+
+    print(f"\nSAVING CLEANED DATASET")
+    print("-" * 50)
+    print(f"[OK] Saved as: {output_file} (written in chunks of {chunksize:,} rows)")
+    print(f"[OK] File size: {file_size_mb:.1f} MB")
+    print(f"[OK] Note: Missing values NOT imputed yet (Activity 2 task)")
+
+    print(f"\n" + "="*70)
+    print("ACTIVITY 1 COMPLETE - SUMMARY")
+    print(f"="*70)
+    print(f"- Dataset streamed from data/owid-covid-data.csv")
+    print(f"- Missing values analyzed: {total_missing:,} total missing")
+    print(f"- Dropped {len(cols_to_drop)} columns with >90% missing data")
+    print(f"- Cleaned dataset saved: {profile.rows:,} rows x {kept_columns} columns")
+    print(f"\nNEXT: Run Activity 2 for missing value imputation and feature engineering")
+
 def main():
+    """Run Activity 1 and return the cleaned DataFrame (None when streaming)"""
     print("=" * 70)
     print("ACTIVITY 1: DATA LOADING AND EXPLORATION")
     print("Following Project Brief Requirements")
@@ -46,17 +205,29 @@ def main():
     # Create output folder
     os.makedirs('activity1_images', exist_ok=True)
     
+    chunksize = settings.csv_chunksize()
+    if chunksize:
+        return main_streaming(chunksize)
+    
     # 1. Load dataset using Pandas
     print("\n1. LOADING DATASET FROM /data DIRECTORY")
     print("-" * 50)
-    try:
-        df = pd.read_csv("data/owid-covid-data.csv")
-        print(f"[OK] Dataset loaded successfully from data/owid-covid-data.csv")
-        print(f"[OK] Original Shape: {df.shape[0]:,} rows, {df.shape[1]} columns")
-        print(f"[OK] Memory usage: ~{df.memory_usage(deep=True).sum() / 1024**2:.1f} MB")
-    except FileNotFoundError:
-        print("[ERROR] data/owid-covid-data.csv not found!")
-        return
+    with profiling.stage('load'):
+        try:
+            df = pd.read_csv("data/owid-covid-data.csv")
+            print(f"[OK] Dataset loaded successfully from data/owid-covid-data.csv")
+            print(f"[OK] Original Shape: {df.shape[0]:,} rows, {df.shape[1]} columns")
+            print(f"[OK] Memory usage: ~{compact.memory_mb(df):.1f} MB")
+        
+            if settings.compact_dtypes():
+                memory_before = compact.memory_mb(df)
+                compact.compact_frame(df)
+                memory_after = compact.memory_mb(df)
+                print(f"[OK] Compact dtypes: ~{memory_before:.1f} MB -> ~{memory_after:.1f} MB "
+                      f"({memory_before / memory_after:.1f}x smaller)")
+        except FileNotFoundError:
+            print("[ERROR] data/owid-covid-data.csv not found!")
+            return
     
     # 2. Show first and last 5 rows
     print("\n2. DISPLAYING FIRST AND LAST 5 ROWS")
@@ -76,17 +247,18 @@ def main():
     print("\n3. CHECKING FOR MISSING VALUES")
     print("-" * 50)
     
-    missing_count = df.isnull().sum()
-    missing_percentage = (missing_count / len(df)) * 100
+    with profiling.stage('missing_values'):
+        missing_count = df.isnull().sum()
+        missing_percentage = (missing_count / len(df)) * 100
     
-    missing_summary = pd.DataFrame({
-        'Column': missing_count.index,
-        'Missing_Count': missing_count.values,
-        'Missing_Percentage': missing_percentage.values
-    }).sort_values('Missing_Percentage', ascending=False)
+        missing_summary = pd.DataFrame({
+            'Column': missing_count.index,
+            'Missing_Count': missing_count.values,
+            'Missing_Percentage': missing_percentage.values
+        }).sort_values('Missing_Percentage', ascending=False)
     
-    total_missing = missing_count.sum()
-    cols_with_missing = (missing_count > 0).sum()
+        total_missing = missing_count.sum()
+        cols_with_missing = (missing_count > 0).sum()
     
     print(f"MISSING VALUES ANALYSIS:")
     print(f"- Total missing values: {total_missing:,}")
@@ -114,7 +286,8 @@ def main():
         print("- No columns have >90% missing data")
     
     # Apply the column dropping
-    df_cleaned = df.drop(columns=cols_to_drop)
+    with profiling.stage('drop_columns'):
+        df_cleaned = df.drop(columns=cols_to_drop)
     print(f"\nSTRUCTURE CLEANED:")
     print(f"- Before: {df.shape[0]:,} rows x {df.shape[1]} columns")
     print(f"- After:  {df_cleaned.shape[0]:,} rows x {df_cleaned.shape[1]} columns")
@@ -124,78 +297,27 @@ def main():
     print("\nCONVERTING DATE COLUMN TO DATETIME")
     print("-" * 50)
     
-    if 'date' in df_cleaned.columns:
-        print(f"BEFORE: {df_cleaned['date'].dtype}")
-        df_cleaned['date'] = pd.to_datetime(df_cleaned['date'])
-        print(f"AFTER:  {df_cleaned['date'].dtype}")
-        print(f"DATE RANGE: {df_cleaned['date'].min()} to {df_cleaned['date'].max()}")
-        print(f"TOTAL DAYS: {(df_cleaned['date'].max() - df_cleaned['date'].min()).days}")
-    else:
-        print("ERROR: 'date' column not found!")
+    with profiling.stage('convert_dates'):
+        if 'date' in df_cleaned.columns:
+            print(f"BEFORE: {df_cleaned['date'].dtype}")
+            df_cleaned['date'] = pd.to_datetime(df_cleaned['date'])
+            print(f"AFTER:  {df_cleaned['date'].dtype}")
+            print(f"DATE RANGE: {df_cleaned['date'].min()} to {df_cleaned['date'].max()}")
+            print(f"TOTAL DAYS: {(df_cleaned['date'].max() - df_cleaned['date'].min()).days}")
+        else:
+            print("ERROR: 'date' column not found!")
     
     # Create visualizations
     print("\nCREATING EXPLORATION VISUALIZATIONS")
     print("-" * 50)
     
-    # Visualization 1: Missing values overview
-    plt.figure(figsize=(15, 10))
-    
-    # Top subplot: Bar chart of missing percentages
-    plt.subplot(2, 1, 1)
-    top_15_missing = missing_summary.head(15)
-    bars = plt.bar(range(len(top_15_missing)), top_15_missing['Missing_Percentage'], 
-                   color=['red' if x > 90 else 'orange' if x > 50 else 'yellow' if x > 10 else 'green' 
-                          for x in top_15_missing['Missing_Percentage']])
-    plt.title('Missing Value Analysis - Top 15 Columns', fontsize=14, fontweight='bold')
-    plt.xlabel('Columns')
-    plt.ylabel('Missing Percentage (%)')
-    plt.xticks(range(len(top_15_missing)), top_15_missing['Column'], rotation=45, ha='right')
-    
-    # Add percentage labels
-    for bar, pct in zip(bars, top_15_missing['Missing_Percentage']):
-        plt.text(bar.get_x() + bar.get_width()/2., bar.get_height() + 1,
-                f'{pct:.1f}%', ha='center', va='bottom', fontsize=9)
-    
-    # Add 90% threshold line
-    plt.axhline(y=90, color='red', linestyle='--', alpha=0.8, label='90% Threshold (Drop Line)')
-    plt.legend()
-    plt.grid(True, alpha=0.3)
-    
-    # Bottom subplot: Data coverage by location
-    plt.subplot(2, 1, 2)
-    location_counts = df_cleaned['location'].value_counts().head(15)
-    plt.bar(range(len(location_counts)), location_counts.values, color='steelblue', alpha=0.8)
-    plt.title('Data Coverage - Top 15 Locations by Record Count', fontsize=14, fontweight='bold')
-    plt.xlabel('Countries/Regions')
-    plt.ylabel('Number of Records')
-    plt.xticks(range(len(location_counts)), location_counts.index, rotation=45, ha='right')
-    
-    # Add value labels
-    for i, v in enumerate(location_counts.values):
-        plt.text(i, v + 20, str(v), ha='center', va='bottom', fontsize=9)
-    
-    plt.tight_layout()
-    plt.savefig('activity1_images/1_data_exploration_overview.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    print("[OK] Saved: data_exploration_overview.png")
-    
-    # Visualization 2: Dataset timeline
-    plt.figure(figsize=(12, 6))
-    daily_records = df_cleaned.groupby('date').size()
-    plt.plot(daily_records.index, daily_records.values, linewidth=2, color='darkblue')
-    plt.title('Daily Record Count Over Time', fontsize=14, fontweight='bold')
-    plt.xlabel('Date')
-    plt.ylabel('Number of Records per Day')
-    plt.grid(True, alpha=0.3)
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig('activity1_images/2_dataset_timeline.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    print("[OK] Saved: dataset_timeline.png")
+    if charts.enabled():
+        plot_exploration(missing_summary, df_cleaned['location'].value_counts(),
+                         df_cleaned.groupby('date').size())
     
     # Save CLEANED dataset (structure cleaned, missing values NOT imputed yet)
-    output_file = 'covid_data_cleaned.csv'
-    df_cleaned.to_csv(output_file, index=False)
+    with profiling.stage('save'):
+        output_file = store.save_dataset(df_cleaned, store.CLEANED_DATASET)
     
     # Check file size
     file_size_mb = os.path.getsize(output_file) / (1024 * 1024)
@@ -218,6 +340,10 @@ def main():
     print(f"- 2 exploration visualizations created")
     print(f"- Cleaned dataset saved: {df_cleaned.shape[0]:,} rows x {df_cleaned.shape[1]} columns")
     print(f"\nNEXT: Run Activity 2 for missing value imputation and feature engineering")
+    return df_cleaned
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    settings.parse_args()
+    main()
+    if not charts.wait():
+        sys.exit(1) 
\ No newline at end of file
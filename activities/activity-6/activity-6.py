@@ -19,120 +19,234 @@ OUTPUTS:
 
 USAGE: python activities/activity-6/activity-6.py
 
-PREREQUISITES: Run Activities 1-2 first to generate covid_data_processed.csv
+PREREQUISITES: Run Activities 1-2 first to generate covid_data_processed
 
-DATA SOURCE: covid_data_processed.csv (complete dataset with imputed values)
+DATA SOURCE: covid_data_processed (complete dataset with imputed values)
 ================================================================================
 """
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
+import sys
+import time
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import charts, country_report, derived, entities, profiling, settings, store, tensor
+
+plt = charts.lazy_import('matplotlib.pyplot')
+sns = charts.lazy_import('seaborn')
+
+# Columns read from the processed dataset
+COLUMNS = ['location', 'entity', 'date', 'continent', 'total_cases', 'total_deaths', 'new_cases']
+
+# Columns of the monthly cube used by chart 6.3
+MONTHLY_COLUMNS = ['location', 'year', 'month', 'new_cases', 'level']
+
 # ==========================================================================
 # CONFIGURATION: CHOOSE A COUNTRY FOR ANALYSIS
-# Change this variable to analyze a different country.
+# Change this variable to analyze a different country, or run with
+# --countries "India,Brazil" (or --countries all) for the batch mode.
 # ==========================================================================
 CHOSEN_COUNTRY = 'United States'
 # ==========================================================================
 
-def main():
+@profiling.profiled('continent_boxplot')
+def plot_continent_boxplot():
+    """Task 3: box plot of the latest total cases of every country by continent"""
+    continent_col = 'continent'
+    # Use the latest data for each country (no aggregate rows) for a meaningful box plot
+    latest_df = entities.countries(derived.load(derived.LATEST_DATASET, columns=COLUMNS))
+    if continent_col in latest_df.columns:
+        latest_df = latest_df.dropna(subset=[continent_col, 'total_cases'])
+    
+        if charts.enabled():
+            plt.figure(figsize=(14, 8))
+            sns.boxplot(data=latest_df, x=continent_col, y='total_cases', palette='viridis')
+            plt.title('Distribution of Total COVID-19 Cases by Continent', fontsize=16, fontweight='bold')
+            plt.xlabel('Continent')
+            plt.ylabel('Total Cases (Log Scale)')
+            plt.yscale('log')
+            plt.xticks(rotation=45, ha='right')
+            plt.tight_layout()
+            charts.save_figure('activity6_images/6.2_cases_by_continent_boxplot.png')
+            plt.close()
+            print("[OK] Saved: 6.2_cases_by_continent_boxplot.png")
+    else:
+        print("[WARNING] Continent column not found for box plot analysis.")
+
+@profiling.profiled('load')
+def load_batch(df=None):
+    """The processed dataset (df when it is already in memory) and the monthly cube"""
+    if df is None:
+        df = store.load_dataset(store.PROCESSED_DATASET, columns=COLUMNS)
+    else:
+        df = store.project(df, COLUMNS)
+    monthly = derived.load(derived.MONTHLY_DATASET, columns=MONTHLY_COLUMNS)
+    return df, monthly
+
+@profiling.profiled('group')
+def group_jobs(countries, df, monthly):
+    """(location, rows, monthly rows) of every requested location that has data"""
+    by_location = {str(name): rows.sort_values('date')
+                   for name, rows in df.groupby('location', observed=True)}
+    monthly = monthly[monthly['level'] == 'location']
+    monthly_by_location = {str(name): rows for name, rows in monthly.groupby('location', observed=True)}
+    if countries == 'all':
+        countries = sorted(by_location)
+    missing = [country for country in countries if country not in by_location]
+    for country in missing:
+        print(f"[WARNING] No data found for '{country}', skipped")
+    jobs = [(country, by_location[country], monthly_by_location.get(country, monthly.iloc[:0]))
+            for country in countries if country in by_location]
+    return jobs
+
+@profiling.profiled('batch_render')
+def render_batch(jobs, workers):
+    """Render charts 6.1 and 6.3 of every job on a process pool; returns the image count"""
+    images = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(jobs) // (workers * 4))
+        for country, files in pool.map(country_report.render_country, jobs, chunksize=chunksize):
+            images += len(files)
+            print(f"[OK] {country}: {', '.join(files)}")
+    return images
+
+def run_batch(countries, df=None):
+    """
+    Charts 6.1 and 6.3 for a list of locations (or 'all'): the data is grouped
+    by location once and the figures are rendered on a process pool.
+    """
+    print("\n1. Loading processed dataset...")
+    try:
+        df, monthly = load_batch(df)
+    except FileNotFoundError:
+        print("[ERROR] covid_data_processed dataset not found!")
+        print("Please run activities 1-2 first.")
+        return
+    print(f"[OK] Dataset loaded: {df.shape[0]} rows, {df.shape[1]} columns")
+
+    jobs = group_jobs(countries, df, monthly)
+    if not jobs:
+        print("[ERROR] None of the requested locations were found in the 'location' column.")
+        return
+
+    if not charts.enabled():
+        print(f"[SKIP] Plots disabled (--no-plots): {len(jobs)} locations checked, no charts rendered")
+        return
+
+    workers = min(settings.batch_jobs(), len(jobs))
+    print(f"\n2. Rendering charts 6.1 and 6.3 for {len(jobs)} locations on {workers} worker processes...")
+    start = time.perf_counter()
+    images = render_batch(jobs, workers)
+    elapsed = time.perf_counter() - start
+    print(f"[OK] Batch complete: {len(jobs)} countries, {images} images in {elapsed:.1f}s "
+          f"({len(jobs) / elapsed:.1f} countries/sec, {workers} workers)")
+
+    print("\n3. Task 3: Creating box plot of total cases by continent...")
+    plot_continent_boxplot()
+
+    print(f"\n*** Activity 6 Complete! Check 'activity6_images' folder for plots. ***")
+
+@profiling.profiled('load')
+def load_country(df=None):
+    """The chosen country's rows (see main() for where they are read from)"""
+    tensors = tensor.open_store() if df is None else None
+    if df is not None:
+        country_df = store.project(df[df['location'] == CHOSEN_COUNTRY], COLUMNS).reset_index(drop=True)
+        print(f"[OK] {CHOSEN_COUNTRY} selected: {country_df.shape[0]} rows, {country_df.shape[1]} columns")
+    elif tensors is not None and CHOSEN_COUNTRY in tensors.locations:
+        country_df = tensors.frame(CHOSEN_COUNTRY, COLUMNS)
+        print(f"[OK] {CHOSEN_COUNTRY} mapped from {tensor.TENSOR_DIR}/: {country_df.shape[0]} rows")
+    else:
+        country_df = store.load_partition(store.PROCESSED_DATASET, CHOSEN_COUNTRY, columns=COLUMNS)
+        print(f"[OK] {CHOSEN_COUNTRY} loaded: {country_df.shape[0]} rows, {country_df.shape[1]} columns")
+    return country_df
+
+@profiling.profiled('country_evolution')
+def plot_country_evolution(country_df):
+    """Task 1 & 2: Evolution of total cases and deaths for a chosen country"""
+    print(f"\n2. Task 1: Plotting total cases and deaths for {CHOSEN_COUNTRY}...")
+    saved = country_report.plot_evolution(country_df, CHOSEN_COUNTRY)
+    if saved:
+        print(f"[OK] Saved: {saved}")
+    else:
+        print("[WARNING] Could not generate country evolution plot.")
+
+@profiling.profiled('monthly_trend')
+def plot_monthly_trend(country_df):
+    """Task 4: Monthly trend analysis of new cases for the selected country, grouped by year"""
+    print(f"\n4. Task 4: Analyzing monthly new cases by year for {CHOSEN_COUNTRY}...")
+    # Monthly sums of the country from the cube precomputed by Activity 2
+    monthly = derived.load(derived.MONTHLY_DATASET, columns=MONTHLY_COLUMNS)
+    saved = country_report.plot_monthly_trend(monthly, CHOSEN_COUNTRY) if 'new_cases' in country_df.columns else None
+    if saved:
+        print(f"[OK] Saved: {saved}")
+    else:
+        print("[WARNING] Could not generate monthly trend plot.")
+
+def main(df=None):
+    """
+    df is the processed dataset when run.py already has it in memory: the
+    chosen country's rows are selected from it. Otherwise they are read from
+    the dense metric store or through the location index of the processed
+    dataset.
+    """
+    countries = settings.batch_countries()
     print("=" * 60)
     print("ACTIVITY 6: IN-DEPTH COUNTRY ANALYSIS")
-    print(f"Analyzing: {CHOSEN_COUNTRY}")
+    if countries:
+        print(f"Batch mode: {'all locations' if countries == 'all' else ', '.join(countries)}")
+    else:
+        print(f"Analyzing: {CHOSEN_COUNTRY}")
     print("=" * 60)
     
     # Create output folder
     os.makedirs('activity6_images', exist_ok=True)
     
-    # Load processed dataset
+    if countries:
+        run_batch(countries, df)
+        return
+    
+    # Load the chosen country's series: from df when it is in memory, from the
+    # dense metric store when Activity 2 built one (--tensor), otherwise only
+    # that country's rows of the processed dataset (through its location index)
     print("\n1. Loading processed dataset...")
     try:
-        df = pd.read_csv('covid_data_processed.csv')
-        df['date'] = pd.to_datetime(df['date'])
-        print(f"[OK] Dataset loaded: {df.shape[0]} rows, {df.shape[1]} columns")
+        country_df = load_country(df)
     except FileNotFoundError:
-        print("[ERROR] covid_data_processed.csv not found!")
+        print("[ERROR] covid_data_processed dataset not found!")
         print("Please run activities 1-2 first.")
         return
-        
-    # Filter data for the chosen country
-    country_df = df[df['location'] == CHOSEN_COUNTRY].copy()
     if country_df.empty:
         print(f"[ERROR] No data found for the chosen country: '{CHOSEN_COUNTRY}'")
         print(f"Please choose a valid country from the 'location' column.")
         return
     
+    if not charts.enabled():
+        latest = country_df.sort_values('date').iloc[-1]
+        print(f"[OK] {CHOSEN_COUNTRY} latest ({latest['date']:%Y-%m-%d}): "
+              f"{latest['total_cases']:,.0f} cases, {latest['total_deaths']:,.0f} deaths")
+        print("[SKIP] Plots disabled (--no-plots)")
+        return
+    
     print(f"\nCreating visualizations for {CHOSEN_COUNTRY}...")
 
-    # Task 1 & 2: Evolution of total cases and deaths for a chosen country
-    print(f"\n2. Task 1: Plotting total cases and deaths for {CHOSEN_COUNTRY}...")
-    if 'total_cases' in country_df.columns and 'total_deaths' in country_df.columns:
-        plt.figure(figsize=(16, 8))
-        plt.plot(country_df['date'], country_df['total_cases'], label='Total Cases', color='blue', linewidth=2)
-        plt.plot(country_df['date'], country_df['total_deaths'], label='Total Deaths', color='red', linewidth=2)
-        plt.title(f'COVID-19 Evolution: Total Cases and Deaths in {CHOSEN_COUNTRY}', fontsize=16, fontweight='bold')
-        plt.xlabel('Date')
-        plt.ylabel('Count')
-        plt.yscale('log')
-        plt.legend()
-        plt.grid(True, which="both", ls="--", alpha=0.5)
-        plt.tight_layout()
-        plt.savefig(f'activity6_images/6.1_country_evolution_{CHOSEN_COUNTRY.replace(" ", "_")}.png', dpi=300, bbox_inches='tight')
-        plt.close()
-        print(f"[OK] Saved: 6.1_country_evolution_{CHOSEN_COUNTRY.replace(' ', '_')}.png")
-    else:
-        print("[WARNING] Could not generate country evolution plot.")
+    plot_country_evolution(country_df)
 
     # Task 3: Box plot of total cases by continent
     print("\n3. Task 3: Creating box plot of total cases by continent...")
-    continent_col = 'continent'
-    if continent_col in df.columns:
-        # Use the latest data for each country for a meaningful box plot
-        latest_df = df.loc[df.groupby('location')['date'].idxmax()]
-        latest_df = latest_df.dropna(subset=[continent_col, 'total_cases'])
-        
-        plt.figure(figsize=(14, 8))
-        sns.boxplot(data=latest_df, x=continent_col, y='total_cases', palette='viridis')
-        plt.title('Distribution of Total COVID-19 Cases by Continent', fontsize=16, fontweight='bold')
-        plt.xlabel('Continent')
-        plt.ylabel('Total Cases (Log Scale)')
-        plt.yscale('log')
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
-        plt.savefig('activity6_images/6.2_cases_by_continent_boxplot.png', dpi=300, bbox_inches='tight')
-        plt.close()
-        print("[OK] Saved: 6.2_cases_by_continent_boxplot.png")
-    else:
-        print("[WARNING] Continent column not found for box plot analysis.")
+    plot_continent_boxplot()
 
-    # Task 4: Monthly trend analysis of new cases for the selected country, grouped by year
-    print(f"\n4. Task 4: Analyzing monthly new cases by year for {CHOSEN_COUNTRY}...")
-    if 'new_cases' in country_df.columns:
-        country_df['year'] = country_df['date'].dt.year
-        country_df['month'] = country_df['date'].dt.month
-        monthly_trends = country_df.groupby(['year', 'month'])['new_cases'].sum().unstack(level=0)
-        
-        plt.figure(figsize=(16, 8))
-        monthly_trends.plot(kind='line', marker='o', figsize=(16, 8))
-        plt.title(f'Monthly New Cases in {CHOSEN_COUNTRY} by Year', fontsize=16, fontweight='bold')
-        plt.xlabel('Month')
-        plt.ylabel('New Cases')
-        plt.xticks(ticks=range(1, 13), labels=['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
-        plt.legend(title='Year')
-        plt.grid(True, alpha=0.5)
-        plt.tight_layout()
-        plt.savefig(f'activity6_images/6.3_monthly_trend_{CHOSEN_COUNTRY.replace(" ", "_")}.png', dpi=300, bbox_inches='tight')
-        plt.close()
-        print(f"[OK] Saved: 6.3_monthly_trend_{CHOSEN_COUNTRY.replace(' ', '_')}.png")
-    else:
-        print("[WARNING] Could not generate monthly trend plot.")
+    plot_monthly_trend(country_df)
 
     print(f"\n*** Activity 6 Complete! Check 'activity6_images' folder for plots. ***")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    settings.parse_args()
+    main()
+    if not charts.wait():
+        sys.exit(1) 
\ No newline at end of file
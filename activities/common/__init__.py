@@ -0,0 +1,7 @@
+"""
+Shared helpers for the COVID-19 activities (data store, runtime settings).
+
+Activity scripts add the activities/ folder to sys.path and import from here:
+
+    from common import settings, store
+"""
@@ -0,0 +1,236 @@
+"""
+Asynchronous figure saving shared by the activities.
+
+At dpi=300 with bbox_inches='tight', drawing and PNG-encoding a figure is the
+slowest part of most chart stages. save_figure() replaces plt.savefig(): it
+pickles the figure and hands it to a pool of worker processes that render and
+write the PNG, so the activity computes its next chart while the previous one
+is encoded:
+
+    plt.tight_layout()
+    charts.save_figure('activity3_images/3.1_who_regions_cases_deaths.png')
+    plt.close()
+
+- backpressure: at most MAX_PENDING_PER_WORKER figures per worker are queued;
+  save_figure() blocks until a slot frees up, bounding memory
+- barrier: wait() blocks until every queued figure is written and reports the
+  ones that failed. run.py calls it after each in-process activity and the
+  activity scripts call it before exiting
+
+The number of workers comes from --render-jobs (PAI_RENDER_JOBS). With 0
+workers (the default on single-CPU machines), inside worker processes (run.py
+--jobs, the Activity 6 batch mode), for figures that cannot be pickled and
+when a worker died and broke the pool, figures are saved synchronously as
+before.
+
+How figures are written depends on the render profile, --render
+(PAI_RENDER_PROFILE):
+
+    draft        PNG, 72 dpi, no tight-bbox pass (quick iterative runs)
+    screen       PNG, 100 dpi, tight bbox
+    publication  PNG, 300 dpi, tight bbox (default; the original output)
+    vector       SVG with a tight bbox; scatter layers with more than
+                 VECTOR_RASTER_POINTS points are embedded as 300 dpi rasters
+
+Activities always pass a .png path; the vector profile swaps the extension.
+
+Plotting libraries are imported lazily: activities bind plt and sns with
+lazy_import(), so matplotlib and seaborn are only loaded once a chart is
+drawn. With --no-plots (PAI_NO_PLOTS) enabled() is False and the activities
+skip their figures altogether.
+"""
+
+import importlib
+import multiprocessing
+import os
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from common import profiling, settings
+
+# Render profile -> (file format, dpi, bbox_inches)
+RENDER_PROFILES = {
+    'draft': ('png', 72, None),
+    'screen': ('png', 100, 'tight'),
+    'publication': ('png', 300, 'tight'),
+    'vector': ('svg', 300, 'tight'),
+}
+
+# Larger point clouds are rasterized inside vector output
+VECTOR_RASTER_POINTS = 5000
+
+MAX_PENDING_PER_WORKER = 2
+
+_pool = None
+_pool_pid = None
+_slots = None
+_pending = []
+_lock = threading.Lock()
+
+
+class _LazyModule:
+    """Stand-in for a module that imports it on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        return f'<lazy module {self._name!r}>'
+
+
+def lazy_import(name):
+    """Module proxy for name, e.g. plt = charts.lazy_import('matplotlib.pyplot')"""
+    return _LazyModule(name)
+
+
+def enabled():
+    """False when figures are disabled with --no-plots"""
+    return not settings.no_plots()
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _render(path, data, dpi, bbox_inches):
+    """Worker: unpickle a figure and write it"""
+    import matplotlib.pyplot as plt
+    figure = pickle.loads(data)
+    figure.savefig(path, dpi=dpi, bbox_inches=bbox_inches)
+    plt.close(figure)
+    return path
+
+
+def _get_pool():
+    """The worker pool of this process, or None when figures are saved synchronously"""
+    global _pool, _pool_pid, _slots
+    if multiprocessing.parent_process() is not None:
+        return None
+    workers = settings.render_jobs()
+    if workers == 0:
+        return None
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        _pool_pid = os.getpid()
+        _slots = threading.BoundedSemaphore(workers * MAX_PENDING_PER_WORKER)
+    return _pool
+
+
+def _discard_pool(pool):
+    """Forget a broken pool, so the next figure starts a new one"""
+    global _pool
+    if _pool is pool:
+        _pool = None
+    pool.shutdown(wait=False)
+
+
+def _rasterize_point_clouds(figure):
+    """Embed large scatter layers as rasters so vector files stay small"""
+    from matplotlib.collections import Collection
+    for collection in figure.findobj(Collection):
+        if len(collection.get_offsets()) > VECTOR_RASTER_POINTS:
+            collection.set_rasterized(True)
+
+
+def output_path(path, profile=None):
+    """path with the file extension of the render profile"""
+    file_format = RENDER_PROFILES[profile or settings.render_profile()][0]
+    return f'{os.path.splitext(path)[0]}.{file_format}'
+
+
+def save_figure(path, figure=None):
+    """
+    Save figure (default: the current pyplot figure) to path in the background,
+    as the render profile prescribes. Returns the path actually written.
+    The figure can be closed or changed as soon as this returns.
+    """
+    import matplotlib.pyplot as plt
+    figure = figure if figure is not None else plt.gcf()
+    profile = settings.render_profile()
+    file_format, dpi, bbox_inches = RENDER_PROFILES[profile]
+    path = output_path(path, profile)
+    if file_format != 'png':
+        _rasterize_point_clouds(figure)
+    with profiling.stage('savefig'):
+        pool = _get_pool()
+        data = None
+        if pool is not None:
+            try:
+                data = pickle.dumps(figure)
+            except Exception:
+                data = None
+        if data is None:
+            figure.savefig(path, dpi=dpi, bbox_inches=bbox_inches)
+            return path
+
+        slots = _slots
+        slots.acquire()
+        try:
+            future = pool.submit(_render, path, data, dpi, bbox_inches)
+        except BrokenProcessPool:
+            slots.release()
+            _discard_pool(pool)
+            print(f"[WARNING] Render workers stopped, saving {path} synchronously")
+            figure.savefig(path, dpi=dpi, bbox_inches=bbox_inches)
+            return path
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        with _lock:
+            _pending.append((path, future))
+    return path
+
+
+def density_grid(x, y, values, bins, log_x=False):
+    """
+    Bin a point cloud into a fixed bins=(nx, ny) grid for density plots.
+    Returns (x_edges, y_edges, counts, mean of values per bin, bin count of every
+    point); empty bins have a NaN mean. With log_x the x bins are equal-width in
+    log10 space (x must be positive). Costs one pass over the points, so
+    drawing the grid does not depend on the number of rows.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    values = np.asarray(values, dtype=float)
+    bx = np.log10(x) if log_x else x
+    x_edges = np.linspace(bx.min(), bx.max(), bins[0] + 1)
+    y_edges = np.linspace(y.min(), y.max(), bins[1] + 1)
+    counts, _, _ = np.histogram2d(bx, y, bins=(x_edges, y_edges))
+    sums, _, _ = np.histogram2d(bx, y, bins=(x_edges, y_edges), weights=values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(counts > 0, sums / counts, np.nan)
+
+    ix = np.clip(np.searchsorted(x_edges, bx, side='right') - 1, 0, bins[0] - 1)
+    iy = np.clip(np.searchsorted(y_edges, y, side='right') - 1, 0, bins[1] - 1)
+    point_counts = counts[ix, iy]
+    if log_x:
+        x_edges = 10 ** x_edges
+    return x_edges, y_edges, counts, means, point_counts
+
+
+def wait():
+    """Block until every queued figure is written; False if any of them failed"""
+    with _lock:
+        pending = list(_pending)
+        _pending.clear()
+    ok = True
+    with profiling.stage('savefig_wait'):
+        for path, future in pending:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"[ERROR] Could not save {path}: {e}")
+                ok = False
+    return ok
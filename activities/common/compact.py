@@ -0,0 +1,68 @@
+"""
+Compact in-memory representation of the datasets (--compact).
+
+compact_frame() shrinks a frame without changing any value:
+
+- float64 columns whose values are all whole numbers (and that have no
+  missing values) become int32 when the values fit
+- other float64 columns become float32 when every value survives the round
+  trip float64 -> float32 -> float64 exactly
+- int64 columns become int32 when the values fit (never narrower, so
+  arithmetic on the metrics cannot overflow a small integer type)
+- the string dimensions (iso_code, continent, location, tests_units,
+  month_name) and other low-cardinality string columns become categoricals
+
+Parquet keeps these types, so the activities reading the store get the
+compact frame back as well.
+"""
+
+import numpy as np
+import pandas as pd
+
+from common import store
+
+# String columns always stored as categoricals in compact mode
+CATEGORICAL_COLUMNS = store.DICTIONARY_COLUMNS + ['month_name']
+
+# Other string columns become categoricals below this distinct/rows ratio
+CATEGORY_MAX_RATIO = 0.5
+
+
+def memory_mb(df):
+    """Deep memory usage of df in MB"""
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def csv_dtypes():
+    """dtype= argument for pd.read_csv that loads the string dimensions as categoricals"""
+    return {col: 'category' for col in store.DICTIONARY_COLUMNS}
+
+
+def _fits_int32(values):
+    info = np.iinfo(np.int32)
+    return len(values) == 0 or (values.min() >= info.min and values.max() <= info.max)
+
+
+def _compact_float(series):
+    values = series.to_numpy()
+    missing = np.isnan(values)
+    if not missing.any() and np.array_equal(values, np.round(values)) and _fits_int32(values):
+        return series.astype('int32')
+    narrow = values.astype('float32')
+    if np.array_equal(narrow.astype('float64'), values, equal_nan=True):
+        return pd.Series(narrow, index=series.index, name=series.name)
+    return series
+
+
+def compact_frame(df):
+    """Downcast the columns of df in place (losslessly) and return df"""
+    for col in df.columns:
+        dtype = df[col].dtype
+        if dtype == 'float64':
+            df[col] = _compact_float(df[col])
+        elif dtype == 'int64' and _fits_int32(df[col].to_numpy()):
+            df[col] = df[col].astype('int32')
+        elif dtype == object and col != store.DATE_COLUMN:
+            if col in CATEGORICAL_COLUMNS or (len(df) and df[col].nunique() / len(df) < CATEGORY_MAX_RATIO):
+                df[col] = df[col].astype('category')
+    return df
@@ -0,0 +1,88 @@
+"""
+Per-country charts of Activity 6: 6.1 (total cases and deaths over time) and
+6.3 (monthly new cases by year).
+
+Activity 6 draws them for its chosen country. In batch mode (--countries) it
+groups the data by location once and sends one render_country() call per
+location to a process pool; the functions live here rather than in the
+activity script so worker processes can import them by name.
+"""
+
+import os
+
+from common import charts, derived
+
+plt = charts.lazy_import('matplotlib.pyplot')
+
+OUTPUT_DIR = 'activity6_images'
+
+MONTH_LABELS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+def file_stem(country):
+    """Country name as used in the output file names"""
+    return country.replace(' ', '_')
+
+
+def evolution_file(country):
+    return f'6.1_country_evolution_{file_stem(country)}.png'
+
+
+def monthly_trend_file(country):
+    return f'6.3_monthly_trend_{file_stem(country)}.png'
+
+
+def plot_evolution(country_df, country):
+    """Chart 6.1 for one country; returns the file name, or None without the columns"""
+    if 'total_cases' not in country_df.columns or 'total_deaths' not in country_df.columns:
+        return None
+    plt.figure(figsize=(16, 8))
+    plt.plot(country_df['date'], country_df['total_cases'], label='Total Cases', color='blue', linewidth=2)
+    plt.plot(country_df['date'], country_df['total_deaths'], label='Total Deaths', color='red', linewidth=2)
+    plt.title(f'COVID-19 Evolution: Total Cases and Deaths in {country}', fontsize=16, fontweight='bold')
+    plt.xlabel('Date')
+    plt.ylabel('Count')
+    plt.yscale('log')
+    plt.legend()
+    plt.grid(True, which="both", ls="--", alpha=0.5)
+    plt.tight_layout()
+    saved = charts.save_figure(f'{OUTPUT_DIR}/{evolution_file(country)}')
+    plt.close()
+    return os.path.basename(saved)
+
+
+def plot_monthly_trend(monthly, country):
+    """
+    Chart 6.3 for one country from monthly cube rows (only the country's rows
+    are needed); returns the file name, or None without new cases
+    """
+    if 'new_cases' not in monthly.columns:
+        return None
+    monthly_trends = derived.slice_monthly(monthly, by=['year', 'month'], metrics=['new_cases'],
+                                           location=country)
+    monthly_trends = monthly_trends.pivot(index='month', columns='year', values='new_cases')
+
+    plt.figure(figsize=(16, 8))
+    monthly_trends.plot(kind='line', marker='o', figsize=(16, 8))
+    plt.title(f'Monthly New Cases in {country} by Year', fontsize=16, fontweight='bold')
+    plt.xlabel('Month')
+    plt.ylabel('New Cases')
+    plt.xticks(ticks=range(1, 13), labels=MONTH_LABELS)
+    plt.legend(title='Year')
+    plt.grid(True, alpha=0.5)
+    plt.tight_layout()
+    saved = charts.save_figure(f'{OUTPUT_DIR}/{monthly_trend_file(country)}')
+    plt.close('all')
+    return os.path.basename(saved)
+
+
+def render_country(job):
+    """
+    Process pool worker: both charts of one country.
+    job is (country, country rows, monthly cube rows); returns (country, files).
+    """
+    country, country_df, monthly = job
+    files = [plot_evolution(country_df, country)]
+    if not monthly.empty:
+        files.append(plot_monthly_trend(monthly, country))
+    return country, [name for name in files if name]
@@ -0,0 +1,273 @@
+"""
+Derived tables materialized from the processed dataset.
+
+Activity 2 builds every table right after it saves covid_data_processed
+(build_all()) and they are stored next to it through common.store:
+
+- covid_data_latest  latest row of every location (what the activities used to
+                     recompute with groupby('location')['date'].idxmax())
+- covid_data_daily   one row per date: global sums of the case/death/test/
+                     vaccination metrics over countries, the number of
+                     country records and the global positivity and fatality rates
+- covid_data_monthly monthly cube: the same metrics summed per location, year
+                     and month ('level' = 'location'), plus continent rollups
+                     of the countries ('level' = 'continent'); query it with
+                     slice_monthly()
+
+Global and continent totals are computed over countries only: the OWID
+aggregate rows (World, continents, income groups; see common.entities) would
+otherwise be counted twice. Location-level rows keep their 'entity' label.
+
+Each table has a small sidecar file (<table>.source.json) recording the size
+and modification time of the processed file it was built from. load() checks
+that signature and rebuilds the table from the processed dataset when it no
+longer matches, so a table is never older than the data it summarizes.
+
+The incremental update (common.incremental) does not rebuild the tables:
+update_all() recomputes only the rows touched by the merged (location, date)
+keys, i.e. the latest row of those locations, the daily rows of those dates
+and the monthly rows of those location-months, then the continent rollups
+from the (small) location-level cube.
+"""
+
+import calendar
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from common import entities, store
+
+SOURCE_DATASET = store.PROCESSED_DATASET
+
+LATEST_DATASET = 'covid_data_latest'
+DAILY_DATASET = 'covid_data_daily'
+MONTHLY_DATASET = 'covid_data_monthly'
+
+# Metrics summed over all locations in the daily table (when present)
+DAILY_SUM_COLUMNS = ['new_cases', 'new_deaths', 'new_tests', 'new_vaccinations',
+                     'total_cases', 'total_deaths', 'total_tests']
+
+# Metrics summed per month in the monthly cube (when present)
+MONTHLY_SUM_COLUMNS = ['new_cases', 'new_deaths', 'new_tests', 'new_vaccinations']
+
+MONTH_NAMES = list(calendar.month_name)[1:]
+
+
+def build_latest(df):
+    """Latest row of every location"""
+    return df.loc[df.groupby('location', observed=True)['date'].idxmax()].reset_index(drop=True)
+
+
+def build_daily(df):
+    """Global daily sums, record counts and rates of the countries, from one groupby('date')"""
+    df = entities.countries(df)
+    grouped = df.groupby('date')
+    daily = grouped[[col for col in DAILY_SUM_COLUMNS if col in df.columns]].sum()
+    daily['records'] = grouped.size()
+    daily = daily.reset_index()
+
+    if {'new_cases', 'new_tests'} <= set(daily.columns):
+        daily['positivity_rate'] = (daily['new_cases'] / daily['new_tests']) * 100
+    if {'total_cases', 'total_deaths'} <= set(daily.columns):
+        daily['fatality_rate'] = np.where(
+            daily['total_cases'] > 0,
+            (daily['total_deaths'] / daily['total_cases']) * 100,
+            np.nan
+        )
+    return daily
+
+
+def build_monthly(df):
+    """Monthly sums per location (with its continent) plus continent rollups"""
+    metrics = [col for col in MONTHLY_SUM_COLUMNS if col in df.columns]
+    keys = [df['location'], entities.classify(df)]
+    if 'continent' in df.columns:
+        keys.append(df['continent'])
+    keys += [df['date'].dt.year.rename('year'), df['date'].dt.month.rename('month')]
+
+    grouped = df[metrics].groupby(keys, observed=True, dropna=False)
+    by_location = grouped.sum()
+    by_location['days'] = grouped.size()
+    by_location = by_location.reset_index()
+    by_location['level'] = 'location'
+    if 'continent' not in by_location.columns:
+        return by_location
+    return pd.concat([by_location, _rollup_continents(by_location, metrics)], ignore_index=True)
+
+
+def _rollup_continents(by_location, metrics):
+    """Continent rows of the monthly cube, summed from its country rows"""
+    countries = by_location[by_location[entities.ENTITY_COLUMN] == entities.COUNTRY]
+    by_continent = countries.groupby(['continent', 'year', 'month'], observed=True)[metrics + ['days']].sum()
+    by_continent = by_continent.reset_index()
+    by_continent['level'] = 'continent'
+    return by_continent
+
+
+def slice_monthly(cube, by, metrics=None, level='location', **filters):
+    """
+    Sum the metrics of the monthly cube over every dimension not listed in by.
+
+    by may hold 'location', 'entity', 'continent', 'year' and 'month', and the derived
+    dimensions 'month_name' (calendar-ordered categorical) and 'year_month'
+    (first day of the month). level selects the location rows or the
+    continent rollups. filters restrict a dimension to a value or a list of
+    values, e.g. location='India', entity='country' or year=[2021, 2022].
+    Rows come back in calendar order.
+    """
+    rows = cube[cube['level'] == level]
+    for dim, values in filters.items():
+        values = values if isinstance(values, (list, tuple, set)) else [values]
+        rows = rows[rows[dim].isin(values)]
+
+    metrics = metrics or [col for col in MONTHLY_SUM_COLUMNS + ['days'] if col in cube.columns]
+    keys = []
+    for dim in by:
+        for key in {'month_name': ['month'], 'year_month': ['year', 'month']}.get(dim, [dim]):
+            if key not in keys:
+                keys.append(key)
+    result = rows.groupby(keys, observed=True)[metrics].sum().reset_index()
+    result = result.sort_values([key for key in ('year', 'month') if key in keys] or keys, kind='stable')
+
+    if 'month_name' in by:
+        names = pd.Categorical([MONTH_NAMES[m - 1] for m in result['month']],
+                               categories=MONTH_NAMES, ordered=True)
+        result['month_name'] = names.remove_unused_categories()
+    if 'year_month' in by:
+        result['year_month'] = pd.to_datetime(dict(year=result['year'], month=result['month'], day=1))
+    return result[list(by) + metrics].reset_index(drop=True)
+
+
+BUILDERS = {
+    LATEST_DATASET: build_latest,
+    DAILY_DATASET: build_daily,
+    MONTHLY_DATASET: build_monthly,
+}
+
+
+def _location_months(locations, years, months):
+    """(location, year, month) keys as a MultiIndex"""
+    return pd.MultiIndex.from_arrays([locations.astype(str).to_numpy(), years.to_numpy(), months.to_numpy()])
+
+
+def update_latest(table, df, keys):
+    """Latest table with the rows of the locations in keys recomputed from df"""
+    locations = keys['location'].unique()
+    fresh = build_latest(df[df['location'].isin(locations)])
+    table = pd.concat([table[~table['location'].isin(locations)], fresh], ignore_index=True)
+    return table.sort_values('location', key=lambda s: s.astype(str), kind='stable').reset_index(drop=True)
+
+
+def update_daily(table, df, keys):
+    """Daily table with the rows of the dates in keys recomputed from df"""
+    dates = keys['date'].unique()
+    fresh = build_daily(df[df['date'].isin(dates)])
+    table = pd.concat([table[~table['date'].isin(dates)], fresh], ignore_index=True)
+    return table.sort_values('date', kind='stable').reset_index(drop=True)
+
+
+def update_monthly(table, df, keys):
+    """Monthly cube with the location-months in keys recomputed from df"""
+    touched = _location_months(keys['location'], keys['date'].dt.year, keys['date'].dt.month).unique()
+    rows = df[_location_months(df['location'], df['date'].dt.year, df['date'].dt.month).isin(touched)]
+    fresh = build_monthly(rows)
+
+    by_location = table[table['level'] == 'location']
+    stale = _location_months(by_location['location'], by_location['year'], by_location['month']).isin(touched)
+    by_location = pd.concat([by_location[~stale], fresh[fresh['level'] == 'location']], ignore_index=True)
+    order = np.lexsort((by_location['month'], by_location['year'], by_location['location'].astype(str)))
+    by_location = by_location.iloc[order].reset_index(drop=True)
+    if 'continent' not in by_location.columns:
+        return by_location
+    metrics = [col for col in MONTHLY_SUM_COLUMNS if col in by_location.columns]
+    return pd.concat([by_location, _rollup_continents(by_location, metrics)], ignore_index=True)
+
+
+UPDATERS = {
+    LATEST_DATASET: update_latest,
+    DAILY_DATASET: update_daily,
+    MONTHLY_DATASET: update_monthly,
+}
+
+
+def source_path(name):
+    return f'{name}.source.json'
+
+
+def source_signature():
+    """Identity of the processed dataset file currently in the store"""
+    path = store.dataset_path(SOURCE_DATASET)
+    stat = os.stat(path)
+    return {'path': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _store(name, table):
+    """Store a table built from the processed dataset currently in the store"""
+    store.save_dataset(table, name)
+    with open(source_path(name), 'w') as f:
+        json.dump(source_signature(), f, indent=2)
+    return table
+
+
+def save(name, df):
+    """Build one table from the processed frame df, store it and return it"""
+    return _store(name, BUILDERS[name](df))
+
+
+def build_all(df):
+    """Build and store every table from the processed frame (called by Activity 2)"""
+    for name in BUILDERS:
+        save(name, df)
+
+
+def load_current():
+    """
+    Every stored table that is current, by name (None for the others). Taken
+    by the incremental update before it replaces the processed dataset.
+    """
+    return {name: store.load_dataset(name) if is_current(name) else None for name in BUILDERS}
+
+
+def update_all(df, keys, tables):
+    """
+    Bring every table up to date with the processed frame df (already stored)
+    after the rows with the (location, date) keys changed. tables comes from
+    load_current(); tables that were not current are rebuilt from df.
+    """
+    for name in BUILDERS:
+        if tables.get(name) is None:
+            save(name, df)
+        else:
+            _store(name, UPDATERS[name](tables[name], df, keys))
+
+
+def is_current(name):
+    """True when the stored table was built from the current processed dataset"""
+    try:
+        store.dataset_path(name)
+        with open(source_path(name)) as f:
+            return json.load(f) == source_signature()
+    except (OSError, ValueError):
+        return False
+
+
+def load(name, columns=None):
+    """
+    Load a derived table (columns is an optional manifest, as in
+    store.load_dataset), rebuilding it first if the processed dataset changed.
+    Raises FileNotFoundError when there is no processed dataset.
+    """
+    if not is_current(name):
+        print(f"[*] Rebuilding {name} from {SOURCE_DATASET}")
+        save(name, store.load_dataset(SOURCE_DATASET))
+    return store.load_dataset(name, columns=columns)
+
+
+def dataset_files():
+    """All files of every derived table (used by 'run.py clean')"""
+    files = []
+    for name in BUILDERS:
+        files += store.dataset_files(name) + [source_path(name)]
+    return files
@@ -0,0 +1,115 @@
+"""
+Classification of OWID locations into countries and aggregate rows.
+
+The OWID file mixes real countries with rollup rows (World, continents,
+income groups, the EU, ...) that carry OWID_* iso codes. Summing over every
+row double-counts those totals, so aggregations should run over countries
+only. classify() labels every row with one of ENTITY_TYPES; masks() and
+split() expose the labels as boolean masks and pre-split frames.
+
+Classification works on the iso_code column (falling back to the location
+name) and maps the distinct codes only, so it is cheap even on the full
+dataset and does not depend on the continent column, which Activity 2 imputes.
+"""
+
+import numpy as np
+import pandas as pd
+
+COUNTRY = 'country'
+CONTINENT = 'continent'
+INCOME_GROUP = 'income_group'
+WORLD = 'world'
+OTHER_AGGREGATE = 'other_aggregate'
+
+ENTITY_TYPES = [COUNTRY, CONTINENT, INCOME_GROUP, WORLD, OTHER_AGGREGATE]
+
+ENTITY_COLUMN = 'entity'
+
+WORLD_CODES = {'OWID_WRL': 'World'}
+CONTINENT_CODES = {
+    'OWID_AFR': 'Africa', 'OWID_ASI': 'Asia', 'OWID_EUR': 'Europe',
+    'OWID_NAM': 'North America', 'OWID_OCE': 'Oceania', 'OWID_SAM': 'South America',
+}
+INCOME_GROUP_CODES = {
+    'OWID_HIC': 'High income', 'OWID_UMC': 'Upper middle income',
+    'OWID_LMC': 'Lower middle income', 'OWID_LIC': 'Low income',
+}
+# OWID_* codes that belong to real territories rather than aggregates
+COUNTRY_OWID_CODES = {'OWID_KOS': 'Kosovo', 'OWID_CYN': 'Northern Cyprus'}
+
+AGGREGATE_PREFIX = 'OWID_'
+
+
+def _classify_code(iso_code, location):
+    if isinstance(iso_code, str) and iso_code:
+        if iso_code in WORLD_CODES:
+            return WORLD
+        if iso_code in CONTINENT_CODES:
+            return CONTINENT
+        if iso_code in INCOME_GROUP_CODES:
+            return INCOME_GROUP
+        if iso_code.startswith(AGGREGATE_PREFIX) and iso_code not in COUNTRY_OWID_CODES:
+            return OTHER_AGGREGATE
+        return COUNTRY
+    # No iso code: fall back to the well-known aggregate names
+    if location in WORLD_CODES.values():
+        return WORLD
+    if location in CONTINENT_CODES.values():
+        return CONTINENT
+    if location in INCOME_GROUP_CODES.values():
+        return INCOME_GROUP
+    return COUNTRY
+
+
+def classify(df):
+    """Entity type of every row of df, as a categorical Series"""
+    if ENTITY_COLUMN in df.columns:
+        return df[ENTITY_COLUMN]
+    iso = df['iso_code'] if 'iso_code' in df.columns else pd.Series(np.nan, index=df.index)
+    location = df['location'] if 'location' in df.columns else pd.Series(np.nan, index=df.index)
+
+    # Classify each distinct iso code once, then broadcast; rows without a
+    # code are classified by their distinct location names
+    codes, uniques = pd.factorize(iso)
+    labels = np.array([_classify_code(code, None) for code in uniques] + [None], dtype=object)
+    values = labels[codes]
+    missing = codes == -1
+    if missing.any():
+        name_codes, names = pd.factorize(location[missing])
+        name_labels = np.array([_classify_code(None, name) for name in names] + [COUNTRY], dtype=object)
+        values[missing] = name_labels[name_codes]
+    return pd.Series(pd.Categorical(values, categories=ENTITY_TYPES), index=df.index, name=ENTITY_COLUMN)
+
+
+def add_entity_column(df):
+    """Add the 'entity' column to df in place and return df"""
+    df[ENTITY_COLUMN] = classify(df)
+    return df
+
+
+def masks(df):
+    """Boolean mask of every entity type"""
+    entity = classify(df)
+    return {kind: (entity == kind).to_numpy() for kind in ENTITY_TYPES}
+
+
+def is_country(df):
+    """Boolean mask of the rows that are real countries"""
+    return (classify(df) == COUNTRY).to_numpy()
+
+
+def countries(df):
+    """Rows of df that are real countries"""
+    return df[is_country(df)]
+
+
+def split(df):
+    """df split into one frame per entity type"""
+    return {kind: df[mask] for kind, mask in masks(df).items()}
+
+
+def summary(df):
+    """Number of distinct locations of every entity type"""
+    locations = pd.DataFrame({'location': df['location'], ENTITY_COLUMN: classify(df)})
+    counts = locations.drop_duplicates('location')[ENTITY_COLUMN].value_counts()
+    return {kind: int(counts.get(kind, 0)) for kind in ENTITY_TYPES}
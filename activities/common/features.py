@@ -0,0 +1,26 @@
+"""
+Date features Activity 2 adds to the processed dataset.
+
+add_date_features() is shared by Activity 2 and the incremental update
+(common.incremental), so rows merged into the processed dataset later carry
+exactly the same columns and types as a full build.
+"""
+
+DATE_COLUMN = 'date'
+
+DATE_FEATURES = ['year', 'month', 'month_name', 'quarter', 'day_of_year', 'week_of_year']
+
+
+def add_date_features(df):
+    """Add the DATE_FEATURES columns of df['date'] in place and return df"""
+    dates = df[DATE_COLUMN].dt
+    # Basic date components as requested
+    df['year'] = dates.year
+    df['month'] = dates.month
+    df['month_name'] = dates.month_name()
+
+    # Additional useful features
+    df['quarter'] = dates.quarter
+    df['day_of_year'] = dates.dayofyear
+    df['week_of_year'] = dates.isocalendar().week
+    return df
@@ -0,0 +1,106 @@
+"""
+Input fingerprints for incremental 'run.py all' rebuilds.
+
+An activity's fingerprint hashes everything its outputs depend on: its input
+data (the raw OWID file for Activity 1, the fingerprint of the upstream
+activity otherwise), its own script, the shared common/ package and the PAI_*
+settings that shape its outputs (settings.snapshot(); worker counts and the
+chunk size are left out). Module constants such as Activity 6's
+CHOSEN_COUNTRY are covered by the script hash.
+
+After a successful run the fingerprint and the list of produced files are
+written to activity<N>_images/.fingerprint.json. The next run skips the
+activity when the fingerprint is unchanged and all those files still exist.
+Running an activity on its own (run.py activityN, run.py profile) deletes
+the fingerprints of that activity and of every activity downstream of it,
+since their outputs may no longer match what was recorded.
+"""
+
+import glob
+import hashlib
+import json
+import os
+
+from common import settings
+
+COMMON_DIR = os.path.dirname(os.path.abspath(__file__))
+
+FINGERPRINT_FILE = '.fingerprint.json'
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path):
+    """sha256 of a file's contents ('missing' when it does not exist)"""
+    if not os.path.exists(path):
+        return 'missing'
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def common_digest():
+    """Combined sha256 of the shared common/ package sources"""
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(COMMON_DIR, '*.py'))):
+        digest.update(os.path.basename(path).encode())
+        digest.update(file_digest(path).encode())
+    return digest.hexdigest()
+
+
+def compute(script_path, data_digest, common=None):
+    """
+    Fingerprint of one activity as a dict. data_digest is the digest of the
+    raw input file or the 'digest' of the upstream activity's fingerprint.
+    """
+    inputs = {
+        'data': data_digest,
+        'script': file_digest(script_path),
+        'common': common if common is not None else common_digest(),
+        'parameters': settings.snapshot(),
+    }
+    encoded = json.dumps(inputs, sort_keys=True).encode()
+    return {'digest': hashlib.sha256(encoded).hexdigest(), 'inputs': inputs}
+
+
+def fingerprint_path(output_dir):
+    return os.path.join(output_dir, FINGERPRINT_FILE)
+
+
+def load(output_dir):
+    """The recorded fingerprint of an output folder, or None"""
+    try:
+        with open(fingerprint_path(output_dir)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_up_to_date(output_dir, fingerprint):
+    """True when output_dir was produced from the same inputs and is complete"""
+    recorded = load(output_dir)
+    if not recorded or recorded.get('digest') != fingerprint['digest']:
+        return False
+    outputs = recorded.get('outputs', [])
+    return bool(outputs) and all(os.path.exists(path) for path in outputs)
+
+
+def invalidate(output_dir):
+    """Forget the recorded fingerprint of output_dir, so the next run re-runs it"""
+    if os.path.exists(fingerprint_path(output_dir)):
+        os.remove(fingerprint_path(output_dir))
+
+
+def record(output_dir, fingerprint, extra_outputs=()):
+    """Store the fingerprint together with the files currently in output_dir"""
+    outputs = sorted(
+        os.path.join(output_dir, name) for name in os.listdir(output_dir)
+        if name != FINGERPRINT_FILE
+    ) if os.path.isdir(output_dir) else []
+    outputs += [path for path in extra_outputs if os.path.exists(path)]
+
+    os.makedirs(output_dir, exist_ok=True)
+    with open(fingerprint_path(output_dir), 'w') as f:
+        json.dump(dict(fingerprint, outputs=outputs), f, indent=2)
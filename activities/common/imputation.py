@@ -0,0 +1,214 @@
+"""
+Missing-value imputation for Activity 2.
+
+impute() fills the numerical columns according to a strategy (selected with
+--impute / PAI_IMPUTE_STRATEGY, see common.settings):
+
+- median           global median of the column (the original behaviour)
+- location_median  median of the column within the same location
+- ffill            last reported value of the same location (earlier gaps take
+                   the first reported value)
+- interpolate      linear interpolation over time between the surrounding
+                   reported values of the same location (gaps at either end
+                   take the nearest reported value)
+
+The per-location strategies keep cumulative series such as total_cases
+monotonic within a country, which the global median does not. They run as a
+few grouped operations over the whole numerical block (groupby ffill/bfill/
+transform), never as a Python loop over locations or columns. Values a
+strategy cannot fill (a location that never reports a column) fall back to
+the global median, so the result has no missing values either way.
+
+Categorical columns are filled with their mode; ffill and interpolate first
+carry values forward/backward within the location.
+
+Medians are computed in one vectorized pass over the numerical block
+(np.nanmedian along the rows) and filled with a single masked assignment.
+The global medians and modes are always those of the data before the
+per-location pass, whatever the strategy.
+
+The incremental update (common.incremental) imputes only the rows it merges
+and passes fill_values: the global medians/modes recorded at the last full
+build, which are used instead of the ones of the rows at hand.
+"""
+
+import numpy as np
+import pandas as pd
+
+from common import settings
+
+GROUP_COLUMN = 'location'
+DATE_COLUMN = 'date'
+
+# Fill value of a categorical column that has no value at all
+UNKNOWN = 'Unknown'
+
+
+def _stat(column, kind, missing_count, fill_value, strategy):
+    return {
+        'column': column,
+        'type': kind,
+        'missing_count': missing_count,
+        'fill_value': fill_value,
+        'strategy': strategy,
+    }
+
+
+def column_groups(df):
+    """Numerical and categorical columns of df ('date' is never imputed)"""
+    numerical_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    categorical_cols = [col for col in df.select_dtypes(include=['object', 'category']).columns
+                        if col != DATE_COLUMN]
+    return numerical_cols, categorical_cols
+
+
+def _recorded(fill_values, column):
+    """Recorded fill value of column, or None"""
+    value = (fill_values or {}).get(column)
+    return None if value is None or (isinstance(value, float) and np.isnan(value)) else value
+
+
+def _medians(df, columns, fill_values=None):
+    """Global median (or recorded fill value) of every column, in one pass"""
+    values = df[columns].to_numpy(dtype='float64')
+    # Median of each column (axis 0) in one call; a column with no values stays NaN
+    medians = np.nanmedian(values, axis=0) if len(values) else np.full(len(columns), np.nan)
+    for i, col in enumerate(columns):
+        recorded = _recorded(fill_values, col)
+        if recorded is not None:
+            medians[i] = recorded
+    return medians
+
+
+def _fill_medians(df, columns, medians):
+    """Fill the gaps left in columns with medians in one masked assignment"""
+    values = df[columns].to_numpy(dtype='float64')
+    np.copyto(values, medians, where=np.isnan(values))
+    df[columns] = values
+
+
+def _modes(df, columns, fill_values=None):
+    """Global mode (or recorded fill value) of every column"""
+    modes = df[columns].mode(dropna=True)
+    fills = {}
+    for col in columns:
+        value = _recorded(fill_values, col)
+        if value is None:
+            value = modes[col].iloc[0] if len(modes) > 0 and pd.notna(modes[col].iloc[0]) else UNKNOWN
+        fills[col] = value
+    return fills
+
+
+def _fill_modes(df, columns, fills):
+    """Fill the gaps left in columns with their fill values"""
+    for col in columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype) and fills[col] not in df[col].cat.categories:
+            df[col] = df[col].cat.add_categories([fills[col]])
+    df.fillna(value=fills, inplace=True)
+
+
+def _time_order(df):
+    """Row positions sorted by location then date, and the location key of each"""
+    keys = pd.factorize(df[GROUP_COLUMN])[0]
+    order = np.lexsort((df[DATE_COLUMN].to_numpy(), keys))
+    return order, keys[order]
+
+
+def _restore(df, block, order):
+    """Put a block computed in time order back into the row order of df"""
+    restored = block.iloc[np.argsort(order)]
+    restored.index = df.index
+    return restored
+
+
+def _carry(block, keys):
+    """Forward fill within each location, then backward fill the leading gaps"""
+    carried = block.groupby(keys).ffill()
+    return carried.fillna(carried.groupby(keys).bfill())
+
+
+def _interpolate(block, keys, times):
+    """
+    Linear interpolation over time within each location, with the nearest
+    reported value at either end. block holds float columns in time order.
+    """
+    values = block.to_numpy(dtype='float64')
+    reported_at = np.where(np.isnan(values), np.nan, times[:, None])
+    # Values and report times side by side: two grouped passes cover all columns
+    both = pd.DataFrame(np.hstack([values, reported_at]))
+    width = values.shape[1]
+    before = both.groupby(keys).ffill().to_numpy()
+    after = both.groupby(keys).bfill().to_numpy()
+    prev_value, prev_time = before[:, :width], before[:, width:]
+    next_value, next_time = after[:, :width], after[:, width:]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = (times[:, None] - prev_time) / (next_time - prev_time)
+        interpolated = prev_value + (next_value - prev_value) * weight
+    result = np.where(np.isnan(prev_value), next_value,
+                      np.where(np.isnan(next_value), prev_value, interpolated))
+    result = np.where(np.isnan(values), result, values)
+    return pd.DataFrame(result, columns=block.columns, index=block.index)
+
+
+def _fill_by_location(df, numerical_cols, categorical_cols, strategy):
+    """Apply a per-location strategy; remaining gaps are left for the global fill"""
+    if strategy == 'location_median':
+        if numerical_cols:
+            medians = df[numerical_cols].groupby(df[GROUP_COLUMN], observed=True).transform('median')
+            df[numerical_cols] = df[numerical_cols].fillna(medians)
+        return
+
+    order, keys = _time_order(df)
+    if numerical_cols:
+        block = df[numerical_cols].iloc[order]
+        if strategy == 'interpolate':
+            dates = df[DATE_COLUMN].to_numpy()[order]
+            times = ((dates - dates.min()) / np.timedelta64(1, 'D')).astype('float64')
+            filled = _interpolate(block, keys, times)
+        else:
+            filled = _carry(block, keys)
+        df[numerical_cols] = _restore(df, filled, order)
+    if categorical_cols:
+        df[categorical_cols] = _restore(df, _carry(df[categorical_cols].iloc[order], keys), order)
+
+
+def impute(df, strategy=settings.DEFAULT_IMPUTE_STRATEGY, fill_values=None):
+    """
+    Fill the missing values of df in place and return the imputation stats:
+    one dict per imputed column with 'column', 'type' ('numerical' or
+    'categorical'), 'missing_count', 'fill_value' (the global median/mode, used
+    for every gap with the median strategy and for the leftovers otherwise) and
+    'strategy'. fill_values maps columns to the global fill value to use
+    instead of the median/mode of df (columns missing from it fall back to df).
+    """
+    if strategy not in settings.IMPUTE_STRATEGIES:
+        raise ValueError(f"Unknown imputation strategy '{strategy}' "
+                         f"(expected one of {', '.join(settings.IMPUTE_STRATEGIES)})")
+
+    numerical_cols, categorical_cols = column_groups(df)
+    missing = df.isnull().sum()
+    numerical_cols = [col for col in numerical_cols if missing[col] > 0]
+    categorical_cols = [col for col in categorical_cols if missing[col] > 0]
+
+    # Global fill values come from the data as given, before the per-location
+    # pass changes the distribution of the columns
+    medians = _medians(df, numerical_cols, fill_values) if numerical_cols else []
+    modes = _modes(df, categorical_cols, fill_values) if categorical_cols else {}
+
+    by_location = strategy != 'median' and {GROUP_COLUMN, DATE_COLUMN} <= set(df.columns)
+    if by_location:
+        _fill_by_location(df, numerical_cols, categorical_cols, strategy)
+    numerical_strategy = strategy if by_location else 'median'
+    categorical_strategy = f'{strategy}+mode' if by_location and strategy in ('ffill', 'interpolate') else 'mode'
+
+    stats = []
+    if numerical_cols:
+        _fill_medians(df, numerical_cols, medians)
+        stats += [_stat(col, 'numerical', missing[col], median, numerical_strategy)
+                  for col, median in zip(numerical_cols, medians)]
+    if categorical_cols:
+        _fill_modes(df, categorical_cols, modes)
+        stats += [_stat(col, 'categorical', missing[col], modes[col], categorical_strategy)
+                  for col in categorical_cols]
+    return stats
@@ -0,0 +1,253 @@
+"""
+Incremental daily update of the cleaned and processed datasets.
+
+OWID republishes the whole file every day but only the last few dates change.
+'python run.py all --incremental' calls update() in place of Activities 1-2:
+
+- every full Activity 2 build records the ingestion state: one hash per
+  cleaned (location, date) row (covid_data_rows) and a manifest
+  (covid_data_ingest.json) with the cleaned columns, the settings that shape
+  the processed data and the global imputation fill values
+- update() reads the new CSV, hashes its rows the same way and diffs them
+  against the state by (location, date): new, changed and removed rows
+- only those rows are imputed (with the recorded fill values), deduplicated
+  and given their date features and entity label. With a per-location
+  --impute strategy the whole history of every touched location is
+  reprocessed, since a new value changes the fills around it
+- the rows are merged into covid_data_processed, the derived tables are
+  updated for the touched keys (common.derived.update_all) and the state is
+  rewritten
+
+update() returns None, and run.py falls back to a full rebuild, when there is
+no state yet or it no longer describes the store: a different column set
+(including a change of the >90%-missing drop list), a different --impute or
+--compact setting, or a processed dataset written by something else.
+
+Fill values stay those of the last full build; 'run.py all --force' recomputes
+them over the whole history. The figures of Activities 1-2 are left as they
+are, the dense metric store (--tensor) is rebuilt from the merged frame.
+"""
+
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from common import compact, derived, entities, features, imputation, ingest, settings, store, tensor
+
+ROWS_DATASET = 'covid_data_rows'
+MANIFEST_FILE = 'covid_data_ingest.json'
+
+KEY_COLUMNS = ['location', 'date']
+
+RAW_DATA_FILE = 'data/owid-covid-data.csv'
+
+
+def row_hashes(df, columns):
+    """
+    64-bit hash of every row of df over columns. Values are normalized first
+    (numbers as float64, strings and categoricals as objects, dates in ns) so
+    a row hashes the same whether it was read from CSV, compacted or loaded
+    back from the store.
+    """
+    normalized = {}
+    for col in columns:
+        series = df[col]
+        if col == store.DATE_COLUMN or pd.api.types.is_datetime64_any_dtype(series):
+            normalized[col] = pd.to_datetime(series).astype('datetime64[ns]')
+        elif pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            normalized[col] = series.astype('float64')
+        else:
+            normalized[col] = series.astype(object).where(series.notna(), None)
+    hashes = pd.util.hash_pandas_object(pd.DataFrame(normalized, index=df.index), index=False)
+    return hashes.to_numpy().view('int64')
+
+
+def key_frame(df, hashes=None):
+    """(location, date[, row_hash]) of every row, locations as plain strings"""
+    keys = pd.DataFrame({'location': df['location'].astype(str).to_numpy(),
+                         'date': pd.to_datetime(df['date']).astype('datetime64[ns]').to_numpy()})
+    if hashes is not None:
+        keys['row_hash'] = hashes
+    return keys
+
+
+def tracked_settings():
+    """Settings that change the processed rows (a change forces a full rebuild)"""
+    return {'impute': settings.impute_strategy(), 'compact': settings.compact_dtypes()}
+
+
+def _json_value(value):
+    value = value.item() if hasattr(value, 'item') else value
+    return None if isinstance(value, float) and np.isnan(value) else value
+
+
+def fill_values(df, columns, stats):
+    """
+    Global fill value of every imputable cleaned column: the ones Activity 2
+    used (stats from imputation.impute()) and the median/mode of the columns
+    that had nothing to fill, in case later rows do
+    """
+    fills = {stat['column']: _json_value(stat['fill_value']) for stat in stats}
+    numerical_cols, categorical_cols = imputation.column_groups(df[[col for col in columns if col in df.columns]])
+    for col in numerical_cols:
+        if col not in fills:
+            values = df[col].to_numpy(dtype='float64')
+            fills[col] = _json_value(np.nanmedian(values)) if (~np.isnan(values)).any() else None
+    for col in categorical_cols:
+        if col not in fills:
+            modes = df[col].mode(dropna=True)
+            fills[col] = _json_value(modes.iloc[0]) if len(modes) else None
+    return fills
+
+
+def save_state(columns, keys, fills):
+    """
+    Record the ingestion state of the processed dataset just stored: the
+    cleaned columns, their key_frame() with row_hashes() and the fill values
+    """
+    store.save_dataset(keys.drop_duplicates(KEY_COLUMNS, keep='last'), ROWS_DATASET)
+    manifest = {
+        'columns': list(columns),
+        'settings': tracked_settings(),
+        'fill_values': fills,
+        'processed': derived.source_signature(),
+    }
+    with open(MANIFEST_FILE, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def dataset_files():
+    """Files of the ingestion state (used by 'run.py clean')"""
+    return store.dataset_files(ROWS_DATASET) + [MANIFEST_FILE]
+
+
+def _rebuild_reason(manifest, columns):
+    """Why the state cannot be used for an incremental update, or None"""
+    if manifest is None:
+        return f"no ingestion state ({MANIFEST_FILE}) from a previous full build"
+    if manifest.get('settings') != tracked_settings():
+        return f"settings changed ({manifest.get('settings')} -> {tracked_settings()})"
+    if manifest.get('columns') != columns:
+        added = sorted(set(columns) - set(manifest.get('columns', [])))
+        removed = sorted(set(manifest.get('columns', [])) - set(columns))
+        return f"schema changed (added: {added or 'none'}, removed: {removed or 'none'})"
+    try:
+        if manifest.get('processed') != derived.source_signature():
+            return f"{store.PROCESSED_DATASET} was rewritten since the last recorded build"
+        store.dataset_path(ROWS_DATASET)
+    except FileNotFoundError as e:
+        return str(e)
+    return None
+
+
+def diff(new_keys, old_keys):
+    """(location, date) keys that are new or changed, and keys that were removed"""
+    merged = new_keys.merge(old_keys, on=KEY_COLUMNS, how='outer', suffixes=('', '_old'), indicator=True)
+    changed = merged[(merged['_merge'] == 'left_only')
+                     | ((merged['_merge'] == 'both') & (merged['row_hash'] != merged['row_hash_old']))]
+    removed = merged[merged['_merge'] == 'right_only']
+    return changed[KEY_COLUMNS].reset_index(drop=True), removed[KEY_COLUMNS].reset_index(drop=True)
+
+
+def _in_keys(df, keys):
+    """Boolean mask of the rows of df whose (location, date) is in keys"""
+    frame = key_frame(df)
+    return pd.MultiIndex.from_frame(frame).isin(pd.MultiIndex.from_frame(keys[KEY_COLUMNS]))
+
+
+def process_rows(rows, strategy, fills):
+    """Activity 2's processing of a subset of cleaned rows (in place); returns the rows"""
+    imputation.impute(rows, strategy, fill_values=fills)
+    rows = rows.drop_duplicates()
+    features.add_date_features(rows)
+    entities.add_entity_column(rows)
+    return rows
+
+
+def _merge(old, rows, stale, location_order):
+    """old without the stale rows plus rows, in location (file order) then date order"""
+    merged = pd.concat([old[~stale]] + ([rows] if len(rows) else []), ignore_index=True)
+    for col in old.columns:
+        if isinstance(old[col].dtype, pd.CategoricalDtype) and not isinstance(merged[col].dtype, pd.CategoricalDtype):
+            merged[col] = merged[col].astype('category')
+    ranks = location_order.get_indexer(merged['location'].astype(str))
+    order = np.lexsort((merged['date'].to_numpy(), ranks))
+    return merged.iloc[order].reset_index(drop=True)
+
+
+def update(path=RAW_DATA_FILE):
+    """
+    Merge the changes of the raw CSV at path into the store. Returns the new
+    processed frame, or None when a full rebuild is needed (the reason is
+    printed).
+    """
+    start = time.perf_counter()
+    raw = pd.read_csv(path)
+    missing = raw.isnull().mean() * 100
+    columns = [col for col in raw.columns if missing[col] <= ingest.DROP_THRESHOLD]
+
+    manifest = load_manifest()
+    reason = _rebuild_reason(manifest, columns)
+    if reason:
+        print(f"[WARNING] Full rebuild needed: {reason}")
+        return None
+
+    cleaned = raw.drop(columns=[col for col in raw.columns if col not in columns])
+    del raw
+    cleaned[store.DATE_COLUMN] = pd.to_datetime(cleaned[store.DATE_COLUMN])
+    new_keys = key_frame(cleaned, row_hashes(cleaned, columns))
+    old_keys = store.load_dataset(ROWS_DATASET)
+    old_keys['location'] = old_keys['location'].astype(str)
+    changed, removed = diff(new_keys.drop_duplicates(KEY_COLUMNS, keep='last'), old_keys)
+    print(f"[OK] Scanned {path}: {len(cleaned):,} rows")
+    print(f"[OK] New or changed rows: {len(changed):,}, removed rows: {len(removed):,}")
+
+    processed = store.load_dataset(store.PROCESSED_DATASET)
+    if len(changed) == 0 and len(removed) == 0:
+        print("[OK] Store already up to date")
+        return processed
+
+    strategy = manifest['settings']['impute']
+    touched = pd.concat([changed, removed], ignore_index=True)
+    if strategy == 'median':
+        # Every row is filled on its own: only the changed rows are reprocessed
+        rows = cleaned[_in_keys(cleaned, changed)].copy()
+        stale = _in_keys(processed, touched)
+    else:
+        # Per-location fills depend on the neighbouring dates: reprocess whole locations
+        locations = touched['location'].unique()
+        rows = cleaned[cleaned['location'].astype(str).isin(locations)].copy()
+        stale = processed['location'].astype(str).isin(locations).to_numpy()
+        touched = pd.concat([key_frame(processed[stale]), key_frame(rows)], ignore_index=True).drop_duplicates()
+    print(f"[OK] Reprocessing {len(rows):,} rows of {touched['location'].nunique()} locations ({strategy})")
+
+    rows = process_rows(rows, strategy, manifest['fill_values'])
+    location_order = pd.Index(pd.unique(cleaned['location'].astype(str)))
+    merged = _merge(processed, rows, stale, location_order)
+    if settings.compact_dtypes():
+        compact.compact_frame(merged)
+        compact.compact_frame(cleaned)
+
+    tables = derived.load_current()
+    store.save_dataset(cleaned, store.CLEANED_DATASET)
+    store.save_dataset(merged, store.PROCESSED_DATASET, partition_by='location')
+    derived.update_all(merged, touched, tables)
+    if settings.tensor_store():
+        tensor.build(merged)
+    save_state(columns, new_keys, manifest['fill_values'])
+
+    print(f"[OK] Merged into {store.dataset_path(store.PROCESSED_DATASET)}: "
+          f"{len(merged):,} rows ({len(processed):,} before)")
+    print(f"[OK] Derived tables updated: {', '.join(derived.BUILDERS)}")
+    print(f"[OK] Incremental update finished in {time.perf_counter() - start:.1f}s")
+    return merged
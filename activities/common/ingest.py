@@ -0,0 +1,130 @@
+"""
+Streaming (out-of-core) ingestion of the raw OWID CSV for Activity 1.
+
+With --chunksize N (PAI_CSV_CHUNKSIZE) Activity 1 never holds the whole file
+in memory:
+
+- scan() reads the CSV in chunks of N rows and accumulates what the report
+  needs: missing counts per column, records per location and per date, the
+  first and last rows and the dtype every column would get from a full load
+- write_cleaned() reads it a second time, keeping only the columns that
+  survive the >90%-missing rule, parses the dates and appends every chunk to
+  the store (store.save_dataset_chunks)
+
+Peak memory is bounded by the chunk size plus one counter per location and
+per date, whatever the size of the file.
+"""
+
+import pandas as pd
+
+from common import store
+
+RAW_DATE_COLUMN = 'date'
+
+# Columns dropped by Activity 1 above this share of missing values (%)
+DROP_THRESHOLD = 90
+
+
+def _kind(series):
+    """dtype a column of one chunk contributes (None for an all-missing chunk)"""
+    if series.isna().all():
+        return None
+    if pd.api.types.is_bool_dtype(series):
+        return 'bool'
+    if pd.api.types.is_integer_dtype(series):
+        return 'int64'
+    if pd.api.types.is_float_dtype(series):
+        return 'float64'
+    return 'object'
+
+
+def _with_missing(kind):
+    """dtype pandas infers for a column of kind that also holds missing values"""
+    return {'int64': 'float64', 'bool': 'object', None: 'float64'}.get(kind, kind)
+
+
+def _merge_kind(a, b):
+    """dtype pandas would infer for the concatenation of two chunks"""
+    if a is None or a == b:
+        return b if b is not None else a
+    if b is None:
+        return a
+    if {a, b} == {'int64', 'float64'}:
+        return 'float64'
+    return 'object'
+
+
+class CsvProfile:
+    """Totals accumulated by scan()"""
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = []
+        self.missing = None
+        self.kinds = {}
+        self.location_counts = pd.Series(dtype='int64')
+        self.date_counts = pd.Series(dtype='int64')
+        self.head = None
+        self.tail = None
+
+    def add(self, chunk):
+        if self.head is None:
+            self.columns = list(chunk.columns)
+            self.head = chunk.head()
+            self.missing = pd.Series(0, index=chunk.columns, dtype='int64')
+        self.tail = pd.concat([self.tail, chunk.tail()]).tail() if self.tail is not None else chunk.tail()
+        self.rows += len(chunk)
+        self.missing = self.missing.add(chunk.isnull().sum(), fill_value=0).astype('int64')
+        self.location_counts = self.location_counts.add(chunk['location'].value_counts(), fill_value=0)
+        self.date_counts = self.date_counts.add(chunk[RAW_DATE_COLUMN].value_counts(), fill_value=0)
+        for col in chunk.columns:
+            self.kinds[col] = _merge_kind(self.kinds.get(col), _kind(chunk[col]))
+
+    def dtypes(self):
+        """
+        dtype of every column as a full pd.read_csv would infer it: an int or
+        bool column with a missing value anywhere (e.g. a chunk where it is
+        entirely missing) becomes float64 or object
+        """
+        kinds = {col: self.kinds.get(col) for col in self.columns}
+        return {col: _with_missing(kind) if kind is None or self.missing[col] > 0 else kind
+                for col, kind in kinds.items()}
+
+    def missing_summary(self):
+        """Missing count and percentage per column, most missing first"""
+        return pd.DataFrame({
+            'Column': self.missing.index,
+            'Missing_Count': self.missing.values,
+            'Missing_Percentage': (self.missing.values / self.rows) * 100 if self.rows else 0.0,
+        }).sort_values('Missing_Percentage', ascending=False)
+
+    def drop_columns(self, threshold=DROP_THRESHOLD):
+        summary = self.missing_summary()
+        return summary[summary['Missing_Percentage'] > threshold]['Column'].tolist()
+
+    def daily_records(self):
+        """Record count per date (as datetimes), in date order"""
+        counts = self.date_counts.astype('int64')
+        counts.index = pd.to_datetime(counts.index)
+        return counts.sort_index()
+
+
+def scan(path, chunksize):
+    """First pass over the CSV: a CsvProfile of the whole file"""
+    profile = CsvProfile()
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        profile.add(chunk)
+    profile.location_counts = profile.location_counts.astype('int64').sort_values(ascending=False, kind='stable')
+    return profile
+
+
+def write_cleaned(path, profile, drop, chunksize, name=store.CLEANED_DATASET):
+    """
+    Second pass: store the CSV without the drop columns and with parsed dates,
+    one chunk at a time. Returns the path of the stored dataset.
+    """
+    keep = [col for col in profile.columns if col not in set(drop)]
+    dtypes = {col: dtype for col, dtype in profile.dtypes().items() if col in keep and col != RAW_DATE_COLUMN}
+    parse_dates = [RAW_DATE_COLUMN] if RAW_DATE_COLUMN in keep else False
+    chunks = pd.read_csv(path, chunksize=chunksize, usecols=keep, dtype=dtypes, parse_dates=parse_dates)
+    return store.save_dataset_chunks(chunks, name)
@@ -0,0 +1,215 @@
+"""
+Per-stage timing and memory profiling for the activities.
+
+Activities mark their named stages with the stage() context manager (or the
+profiled() decorator):
+
+    with profiling.stage('load'):
+        df = store.load_dataset(...)
+
+Stages nest ('regions/savefig'). While profiling is disabled (the default)
+stage() does nothing but yield. 'run.py profile' enables it, runs every
+activity inside activity() and records wall time, CPU time and peak RSS of
+each stage, then writes a JSON report and prints a summary table.
+
+Peak RSS is sampled by a background thread while a stage is open, using
+psutil when it is installed and /proc/self/statm otherwise. On platforms with
+neither, the process-wide high-water mark from the resource module is used.
+"""
+
+import contextlib
+import functools
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_REPORT_FILE = 'profile_report.json'
+
+SAMPLE_INTERVAL = 0.02
+
+_enabled = False
+_records = []
+_path = []
+_activity = None
+_open = []
+_open_lock = threading.Lock()
+_sampler = None
+_order = itertools.count()
+
+
+def _current_rss():
+    """Resident set size of this process in bytes, or None if unavailable"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class _RssSampler(threading.Thread):
+    """Updates the peak RSS of every open stage at a fixed interval"""
+
+    def __init__(self):
+        super().__init__(name='pai-rss-sampler', daemon=True)
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            _sample()
+
+
+def _sample():
+    rss = _current_rss()
+    if rss is None:
+        return
+    with _open_lock:
+        for record in _open:
+            record['peak_rss_bytes'] = max(record['peak_rss_bytes'] or 0, rss)
+
+
+def enable():
+    """Start recording stages (clears earlier records)"""
+    global _enabled, _sampler
+    _records.clear()
+    _enabled = True
+    if _sampler is None:
+        _sampler = _RssSampler()
+        _sampler.start()
+
+
+def disable():
+    global _enabled, _sampler
+    _enabled = False
+    if _sampler is not None:
+        _sampler.stopped.set()
+        _sampler = None
+
+
+def is_enabled():
+    return _enabled
+
+
+@contextlib.contextmanager
+def _measure(activity, name):
+    record = {
+        'activity': activity,
+        'stage': name,
+        'order': next(_order),
+        'wall_s': 0.0,
+        'cpu_s': 0.0,
+        'peak_rss_bytes': _current_rss(),
+    }
+    with _open_lock:
+        _open.append(record)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield record
+    finally:
+        record['wall_s'] = time.perf_counter() - wall_start
+        record['cpu_s'] = time.process_time() - cpu_start
+        _sample()
+        with _open_lock:
+            _open.remove(record)
+        _records.append(record)
+
+
+@contextlib.contextmanager
+def stage(name):
+    """Record one named stage of the current activity"""
+    if not _enabled:
+        yield
+        return
+    _path.append(name)
+    try:
+        with _measure(_activity, '/'.join(_path)):
+            yield
+    finally:
+        _path.pop()
+
+
+def profiled(name=None):
+    """Decorator form of stage(); the stage name defaults to the function name"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def activity(name):
+    """Attribute the stages inside to an activity and record its total"""
+    global _activity, _path
+    if not _enabled:
+        yield
+        return
+    previous, previous_path = _activity, _path
+    _activity, _path = name, []
+    try:
+        with _measure(name, 'total'):
+            yield
+    finally:
+        _activity, _path = previous, previous_path
+
+
+def records():
+    """Recorded stages in completion order"""
+    return list(_records)
+
+
+def write_report(path=DEFAULT_REPORT_FILE):
+    """Write the recorded stages as JSON and return the path"""
+    report = {
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'stages': [
+            {
+                'activity': r['activity'],
+                'stage': r['stage'],
+                'wall_s': round(r['wall_s'], 4),
+                'cpu_s': round(r['cpu_s'], 4),
+                'peak_rss_mb': round(r['peak_rss_bytes'] / 1024 ** 2, 1) if r['peak_rss_bytes'] else None,
+            }
+            for r in _records
+        ],
+    }
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def summary_table():
+    """Recorded stages as a text table, grouped by activity in run order"""
+    order = []
+    for r in _records:
+        if r['activity'] not in order:
+            order.append(r['activity'])
+
+    lines = [f"{'ACTIVITY':<12} {'STAGE':<34} {'WALL (s)':>9} {'CPU (s)':>9} {'PEAK RSS (MB)':>14}",
+             '-' * 82]
+    for name in order:
+        # Stages in the order they started, then the activity total
+        stages = sorted((r for r in _records if r['activity'] == name),
+                        key=lambda r: (r['stage'] == 'total', r['order']))
+        for r in stages:
+            rss = f"{r['peak_rss_bytes'] / 1024 ** 2:.1f}" if r['peak_rss_bytes'] else 'n/a'
+            lines.append(f"{name or '-':<12} {r['stage']:<34} {r['wall_s']:>9.2f} {r['cpu_s']:>9.2f} {rss:>14}")
+        lines.append('')
+    return '\n'.join(lines)
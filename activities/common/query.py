@@ -0,0 +1,214 @@
+"""
+Warm country queries for Activity 6's "user input" requirement.
+
+Activity 6 analyzes one hardcoded country per run. 'run.py query' (an
+interactive prompt) and 'run.py serve' (a local HTTP endpoint) instead load
+the processed dataset once and then answer any location + metric request from
+memory:
+
+    > India total_deaths        line chart saved to query_images/
+    > series India total_cases  dates and values printed
+    > list                      available locations
+
+    GET /countries
+    GET /series?location=India&metric=total_cases   JSON {dates, values}
+    GET /chart?location=India&metric=total_deaths   PNG
+
+Every location's rows are sliced once on first use and cached together with
+the rendered charts, so repeated requests cost a dictionary lookup.
+Charts are drawn on standalone matplotlib Figures (no pyplot state), which
+keeps the threaded HTTP server safe.
+"""
+
+import io
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from common import store
+
+METRICS = ('total_cases', 'total_deaths')
+DEFAULT_METRIC = 'total_cases'
+
+# Columns read from the processed dataset
+COLUMNS = ['location', 'date'] + list(METRICS)
+
+OUTPUT_DIR = 'query_images'
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8000
+
+
+class CountryQuery:
+    """The processed dataset held in memory, with per-location caches"""
+
+    def __init__(self, df=None):
+        if df is None:
+            df = store.load_dataset(store.PROCESSED_DATASET, columns=COLUMNS)
+        self.df = df.reset_index(drop=True)
+        self._rows = self.df.groupby('location', observed=True).indices
+        self._names = {str(location).lower(): str(location) for location in self._rows}
+        self.metrics = [metric for metric in METRICS if metric in self.df.columns]
+        self._slices = {}
+        self._charts = {}
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        """Import matplotlib and render one chart up front, so the first request is fast too"""
+        if self._rows and self.metrics:
+            self.chart(next(iter(self._rows)), self.metrics[0])
+
+    def locations(self):
+        return sorted(self._names.values())
+
+    def resolve(self, location, metric=DEFAULT_METRIC):
+        """Canonical location name and metric; KeyError with a message when unknown"""
+        name = self._names.get(location.strip().lower())
+        if name is None:
+            raise KeyError(f"Unknown location '{location}'")
+        if metric not in self.metrics:
+            raise KeyError(f"Unknown metric '{metric}' (choose from {', '.join(self.metrics)})")
+        return name, metric
+
+    def country(self, location):
+        """Rows of one location sorted by date (cached)"""
+        name, _ = self.resolve(location)
+        if name not in self._slices:
+            rows = self.df.take(self._rows[name]).sort_values('date')
+            self._slices[name] = rows.reset_index(drop=True)
+        return self._slices[name]
+
+    def series(self, location, metric=DEFAULT_METRIC):
+        """Date-indexed series of one metric for one location"""
+        name, metric = self.resolve(location, metric)
+        rows = self.country(name)
+        return rows.set_index('date')[metric]
+
+    def chart(self, location, metric=DEFAULT_METRIC):
+        """PNG bytes of the metric's line chart for one location (cached)"""
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        name, metric = self.resolve(location, metric)
+        key = (name, metric)
+        with self._lock:
+            if key not in self._charts:
+                series = self.series(name, metric)
+                figure = Figure(figsize=(12, 6))
+                FigureCanvasAgg(figure)
+                ax = figure.add_subplot()
+                color = 'red' if metric == 'total_deaths' else 'blue'
+                ax.plot(series.index, series.values, color=color, linewidth=2)
+                ax.set_title(f"COVID-19 {metric.replace('_', ' ').title()} in {name}",
+                             fontsize=14, fontweight='bold')
+                ax.set_xlabel('Date')
+                ax.set_ylabel('Count')
+                ax.grid(True, ls='--', alpha=0.5)
+                figure.tight_layout()
+                buffer = io.BytesIO()
+                figure.savefig(buffer, format='png', dpi=100)
+                self._charts[key] = buffer.getvalue()
+            return self._charts[key]
+
+
+def _split_request(words, metrics):
+    """(location, metric) from the words of a prompt line; the metric is optional and last"""
+    if len(words) > 1 and words[-1] in metrics:
+        return ' '.join(words[:-1]), words[-1]
+    return ' '.join(words), DEFAULT_METRIC
+
+
+def repl(query, input_func=input):
+    """Interactive prompt: '<location> [metric]' saves a chart, 'series ...' prints the values"""
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    print(f"Metrics: {', '.join(query.metrics)} (default: {DEFAULT_METRIC})")
+    print("Enter '<location> [metric]' for a chart, 'series <location> [metric]' for values,")
+    print("'list' for the available locations, 'quit' to exit.")
+    while True:
+        try:
+            line = input_func('> ').strip()
+        except EOFError:
+            break
+        if not line:
+            continue
+        words = line.split()
+        command = words[0].lower()
+        if command in ('quit', 'exit', 'q'):
+            break
+        if command == 'list':
+            print(', '.join(query.locations()))
+            continue
+
+        start = time.perf_counter()
+        try:
+            if command == 'series':
+                location, metric = _split_request(words[1:], query.metrics)
+                series = query.series(location, metric).dropna()
+                print(series.to_string())
+            else:
+                location, metric = _split_request(words, query.metrics)
+                name, metric = query.resolve(location, metric)
+                path = os.path.join(OUTPUT_DIR, f"{name.replace(' ', '_')}_{metric}.png")
+                with open(path, 'wb') as f:
+                    f.write(query.chart(name, metric))
+                print(f"[OK] Saved: {path}")
+        except KeyError as e:
+            print(f"[ERROR] {e.args[0]}")
+            continue
+        print(f"    ({(time.perf_counter() - start) * 1000:.1f} ms)")
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """GET /countries, /series and /chart against the server's CountryQuery"""
+
+    def _send(self, status, body, content_type='application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload).encode())
+
+    def do_GET(self):
+        query = self.server.query
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if url.path == '/countries':
+                self._send_json(200, {'locations': query.locations(), 'metrics': query.metrics})
+            elif url.path == '/series':
+                name, metric = query.resolve(params.get('location', ''), params.get('metric', DEFAULT_METRIC))
+                series = query.series(name, metric)
+                self._send_json(200, {
+                    'location': name,
+                    'metric': metric,
+                    'dates': series.index.strftime('%Y-%m-%d').tolist(),
+                    'values': [None if value != value else float(value) for value in series.values],
+                })
+            elif url.path == '/chart':
+                location, metric = params.get('location', ''), params.get('metric', DEFAULT_METRIC)
+                self._send(200, query.chart(location, metric), 'image/png')
+            else:
+                self._send_json(404, {'error': f"Unknown path '{url.path}'"})
+        except KeyError as e:
+            self._send_json(404, {'error': e.args[0]})
+
+    def log_message(self, format, *args):
+        print(f"[HTTP] {self.address_string()} {format % args}")
+
+
+def serve(query, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Answer HTTP queries until interrupted"""
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    server.query = query
+    print(f"[OK] Serving on http://{host}:{server.server_port}/ "
+          f"(/countries, /series?location=..&metric=.., /chart?location=..&metric=..)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
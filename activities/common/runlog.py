@@ -0,0 +1,97 @@
+"""
+Line-by-line activity output for run.py.
+
+Every line an activity prints is forwarded as soon as it is complete, tagged
+with the activity and a timestamp ("[A3 14:02:11] ...") and, when a log folder
+is given, appended to a rotating per-activity log file (logs/activity3.log).
+This works the same for activities started as child processes (their stdout
+is read line by line) and for activities run in-process (sys.stdout is
+redirected to the writer).
+"""
+
+import contextlib
+import logging
+import logging.handlers
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+DEFAULT_LOG_DIR = 'logs'
+
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+
+
+class LineWriter:
+    """File-like object that prefixes, timestamps and logs complete lines"""
+
+    def __init__(self, prefix, out, logger=None):
+        self.prefix = prefix
+        self.out = out
+        self.logger = logger
+        self._partial = ''
+
+    def write(self, text):
+        lines = (self._partial + text).split('\n')
+        self._partial = lines.pop()
+        for line in lines:
+            self._emit(line)
+        return len(text)
+
+    def _emit(self, line):
+        line = line.rstrip('\r')
+        self.out.write(f"[{self.prefix} {datetime.now():%H:%M:%S}] {line}\n")
+        self.out.flush()
+        if self.logger:
+            self.logger.info(line)
+
+    def flush(self):
+        self.out.flush()
+
+    def close(self):
+        """Emit a trailing line that had no newline"""
+        if self._partial:
+            self._emit(self._partial)
+            self._partial = ''
+
+
+def _activity_logger(activity_num, log_dir):
+    os.makedirs(log_dir, exist_ok=True)
+    logger = logging.getLogger(f'pai.activity{activity_num}')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = logging.handlers.RotatingFileHandler(
+        os.path.join(log_dir, f'activity{activity_num}.log'),
+        maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    logger.addHandler(handler)
+    return logger, handler
+
+
+@contextlib.contextmanager
+def activity_output(activity_num, out=None, log_dir=None):
+    """Yield a LineWriter for one activity, writing to out (default: stdout)"""
+    logger, handler = _activity_logger(activity_num, log_dir) if log_dir else (None, None)
+    writer = LineWriter(f'A{activity_num}', out if out is not None else sys.stdout, logger)
+    try:
+        yield writer
+    finally:
+        writer.close()
+        if handler:
+            logger.removeHandler(handler)
+            handler.close()
+
+
+def stream_command(cmd, writer):
+    """Run a shell command, forwarding its output line by line; True on success"""
+    env = dict(os.environ, PYTHONUNBUFFERED='1')
+    process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               text=True, bufsize=1, env=env)
+    for line in process.stdout:
+        writer.write(line)
+    process.stdout.close()
+    returncode = process.wait()
+    if returncode != 0:
+        writer.write(f"[ERROR] Command exited with status {returncode}: {cmd}\n")
+    return returncode == 0
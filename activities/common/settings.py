@@ -0,0 +1,209 @@
+"""
+Runtime settings shared by every activity.
+
+Settings are kept in environment variables so they reach an activity the same
+way whether it is started directly, by run.py in a subprocess, or imported and
+run in-process. Command line flags are translated into those variables by
+parse_args() (activities) and apply_arguments() (run.py).
+"""
+
+import argparse
+import os
+
+EXPORT_CSV = 'PAI_EXPORT_CSV'
+IMPUTE_STRATEGY = 'PAI_IMPUTE_STRATEGY'
+COMPACT_DTYPES = 'PAI_COMPACT_DTYPES'
+TENSOR_STORE = 'PAI_TENSOR_STORE'
+COUNTRIES = 'PAI_COUNTRIES'
+BATCH_JOBS = 'PAI_BATCH_JOBS'
+RENDER_JOBS = 'PAI_RENDER_JOBS'
+RENDER_PROFILE = 'PAI_RENDER_PROFILE'
+DENSITY_PLOTS = 'PAI_DENSITY_PLOTS'
+NO_PLOTS = 'PAI_NO_PLOTS'
+CSV_CHUNKSIZE = 'PAI_CSV_CHUNKSIZE'
+DENSITY_OUTLIERS = 'PAI_DENSITY_OUTLIERS'
+
+# Settings that change what the activities produce (see snapshot())
+FINGERPRINT_SETTINGS = (EXPORT_CSV, IMPUTE_STRATEGY, COMPACT_DTYPES, TENSOR_STORE, COUNTRIES,
+                        RENDER_PROFILE, DENSITY_PLOTS, DENSITY_OUTLIERS, NO_PLOTS)
+
+# Missing-value strategies of Activity 2 (see common.imputation)
+IMPUTE_STRATEGIES = ('median', 'location_median', 'ffill', 'interpolate')
+DEFAULT_IMPUTE_STRATEGY = 'median'
+
+# Figure quality profiles (see common.charts)
+RENDER_PROFILES = ('draft', 'screen', 'publication', 'vector')
+DEFAULT_RENDER_PROFILE = 'publication'
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+
+def _flag(name):
+    """Read a boolean environment variable"""
+    return os.environ.get(name, '').strip().lower() in TRUE_VALUES
+
+
+def export_csv():
+    """True when the intermediate datasets should also be exported as CSV"""
+    return _flag(EXPORT_CSV)
+
+
+def compact_dtypes():
+    """True when datasets should be kept in compact dtypes (see common.compact)"""
+    return _flag(COMPACT_DTYPES)
+
+
+def tensor_store():
+    """True when Activity 2 should also build the dense metric store (see common.tensor)"""
+    return _flag(TENSOR_STORE)
+
+
+def csv_chunksize():
+    """Rows per chunk of Activity 1's streaming ingestion, or None to load the CSV whole"""
+    try:
+        chunksize = int(os.environ.get(CSV_CHUNKSIZE, ''))
+    except ValueError:
+        return None
+    return chunksize if chunksize > 0 else None
+
+
+def no_plots():
+    """True when the activities should skip every figure (computations and summaries still run)"""
+    return _flag(NO_PLOTS)
+
+
+def density_plots():
+    """True when large scatter plots should be drawn as binned density grids"""
+    return _flag(DENSITY_PLOTS)
+
+
+def density_outliers():
+    """Points from sparse bins sampled on top of a density grid (0: none)"""
+    try:
+        return max(0, int(os.environ.get(DENSITY_OUTLIERS, '')))
+    except ValueError:
+        return 0
+
+
+def batch_countries():
+    """
+    Locations of Activity 6's batch mode: a list of names, 'all', or None
+    (single-country mode)
+    """
+    value = os.environ.get(COUNTRIES, '').strip()
+    if not value:
+        return None
+    if value.lower() == 'all':
+        return 'all'
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def batch_jobs():
+    """Worker processes of Activity 6's batch mode (default: one per CPU)"""
+    try:
+        return max(1, int(os.environ.get(BATCH_JOBS, '')))
+    except ValueError:
+        return os.cpu_count() or 1
+
+
+def render_jobs():
+    """
+    Worker processes that save figures in the background (see common.charts);
+    0 saves them synchronously. Default: up to 4, leaving one CPU to the activity.
+    """
+    try:
+        return max(0, int(os.environ.get(RENDER_JOBS, '')))
+    except ValueError:
+        return max(0, min(4, (os.cpu_count() or 1) - 1))
+
+
+def render_profile():
+    """Figure quality profile (unknown values fall back to the default)"""
+    profile = os.environ.get(RENDER_PROFILE, '').strip().lower() or DEFAULT_RENDER_PROFILE
+    if profile not in RENDER_PROFILES:
+        print(f"[WARNING] Unknown {RENDER_PROFILE} '{profile}', using '{DEFAULT_RENDER_PROFILE}'")
+        return DEFAULT_RENDER_PROFILE
+    return profile
+
+
+def impute_strategy():
+    """Imputation strategy of Activity 2 (unknown values fall back to the default)"""
+    strategy = os.environ.get(IMPUTE_STRATEGY, '').strip().lower() or DEFAULT_IMPUTE_STRATEGY
+    if strategy not in IMPUTE_STRATEGIES:
+        print(f"[WARNING] Unknown {IMPUTE_STRATEGY} '{strategy}', using '{DEFAULT_IMPUTE_STRATEGY}'")
+        return DEFAULT_IMPUTE_STRATEGY
+    return strategy
+
+
+def snapshot():
+    """
+    The output-shaping settings currently in effect (recorded in activity
+    fingerprints). Execution-only settings (worker counts, chunk size) are left
+    out, so changing them does not re-run activities.
+    """
+    return {name: os.environ[name] for name in sorted(FINGERPRINT_SETTINGS) if name in os.environ}
+
+
+def add_arguments(parser):
+    """Register the shared activity flags on an argparse parser"""
+    parser.add_argument('--csv', action='store_true',
+                        help='also export intermediate datasets as CSV')
+    parser.add_argument('--compact', action='store_true',
+                        help='store metrics as int32/float32 and strings as categoricals where lossless')
+    parser.add_argument('--tensor', action='store_true',
+                        help='also build the memory-mapped location x date metric store')
+    parser.add_argument('--impute', choices=IMPUTE_STRATEGIES,
+                        help='missing-value strategy of Activity 2 (default: median)')
+    parser.add_argument('--chunksize', type=int,
+                        help='Activity 1 streams the raw CSV in chunks of this many rows')
+    parser.add_argument('--no-plots', action='store_true',
+                        help='run computations and summaries without creating any figure')
+    parser.add_argument('--density', action='store_true',
+                        help='draw large scatter plots as binned density grids')
+    parser.add_argument('--outliers', type=int,
+                        help='with --density, overlay up to N sampled points from sparse bins')
+    parser.add_argument('--countries',
+                        help="Activity 6 batch mode: comma-separated locations or 'all'")
+    parser.add_argument('--batch-jobs', type=int,
+                        help='worker processes of the Activity 6 batch mode (default: CPU count)')
+    parser.add_argument('--render-jobs', type=int,
+                        help='worker processes saving figures in the background (0: synchronous)')
+    parser.add_argument('--render', choices=RENDER_PROFILES,
+                        help='figure quality profile (default: publication)')
+
+
+def apply_arguments(args):
+    """Copy parsed flags into the environment"""
+    if getattr(args, 'csv', False):
+        os.environ[EXPORT_CSV] = '1'
+    if getattr(args, 'compact', False):
+        os.environ[COMPACT_DTYPES] = '1'
+    if getattr(args, 'tensor', False):
+        os.environ[TENSOR_STORE] = '1'
+    if getattr(args, 'impute', None):
+        os.environ[IMPUTE_STRATEGY] = args.impute
+    if getattr(args, 'chunksize', None):
+        os.environ[CSV_CHUNKSIZE] = str(args.chunksize)
+    if getattr(args, 'no_plots', False):
+        os.environ[NO_PLOTS] = '1'
+    if getattr(args, 'density', False):
+        os.environ[DENSITY_PLOTS] = '1'
+    if getattr(args, 'outliers', None) is not None:
+        os.environ[DENSITY_OUTLIERS] = str(args.outliers)
+    if getattr(args, 'countries', None):
+        os.environ[COUNTRIES] = args.countries
+    if getattr(args, 'batch_jobs', None):
+        os.environ[BATCH_JOBS] = str(args.batch_jobs)
+    if getattr(args, 'render_jobs', None) is not None:
+        os.environ[RENDER_JOBS] = str(args.render_jobs)
+    if getattr(args, 'render', None):
+        os.environ[RENDER_PROFILE] = args.render
+
+
+def parse_args(argv=None):
+    """Parse the shared flags of an activity script, ignoring unknown ones"""
+    parser = argparse.ArgumentParser(add_help=False)
+    add_arguments(parser)
+    args, _ = parser.parse_known_args(argv)
+    apply_arguments(args)
+    return args
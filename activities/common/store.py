@@ -0,0 +1,322 @@
+"""
+Intermediate dataset store shared by the activities.
+
+Activity 1 writes the cleaned dataset, Activity 2 the processed dataset, and
+Activities 3-7 read the processed one. Datasets are stored as Parquet when
+pyarrow is installed: columns keep their types (native datetime 'date',
+dictionary-encoded location/continent) so readers skip CSV parsing and date
+conversion entirely. Without pyarrow the store falls back to CSV.
+
+A CSV copy can still be exported next to the Parquet file with the --csv flag
+(see common.settings).
+
+A dataset saved with partition_by='location' is written sorted by location
+and date, with an index file (<name>.index.json) mapping every location to its
+row range (Parquet) and byte range (CSV). load_partition() uses it to read a
+single location: only the Parquet row groups holding that range, or a single
+seek+read of the CSV, instead of loading and filtering the whole dataset.
+"""
+
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from common import settings
+
+CLEANED_DATASET = 'covid_data_cleaned'
+PROCESSED_DATASET = 'covid_data_processed'
+
+# String dimensions stored as dictionary-encoded (categorical) columns
+DICTIONARY_COLUMNS = ['iso_code', 'continent', 'location', 'tests_units']
+
+DATE_COLUMN = 'date'
+
+# Rows per Parquet row group (the unit read by load_partition())
+ROW_GROUP_SIZE = 16384
+
+# Explicit dtypes used when a dataset has to be read back from CSV
+CSV_DTYPES = {
+    **{col: 'category' for col in DICTIONARY_COLUMNS},
+    'month_name': 'category',
+    'entity': 'category',
+    'year': 'int64',
+    'month': 'int64',
+    'quarter': 'int64',
+    'day_of_year': 'int64',
+    'week_of_year': 'int64',
+}
+
+
+def columnar_available():
+    """True when pyarrow is installed and Parquet can be used"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def parquet_path(name):
+    return f'{name}.parquet'
+
+
+def csv_path(name):
+    return f'{name}.csv'
+
+
+def dataset_path(name):
+    """Path of the stored dataset, preferring Parquet over CSV"""
+    if columnar_available() and os.path.exists(parquet_path(name)):
+        return parquet_path(name)
+    if os.path.exists(csv_path(name)):
+        return csv_path(name)
+    raise FileNotFoundError(f"{name} not found (expected {parquet_path(name)} or {csv_path(name)})")
+
+
+def index_path(name):
+    return f'{name}.index.json'
+
+
+def dataset_files(name):
+    """All files that may hold the dataset (used by 'run.py clean')"""
+    return [parquet_path(name), csv_path(name), index_path(name)]
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _partition_order(df, column):
+    """
+    df sorted by column then date, and the first row and row count of every
+    value. Frames that are already grouped that way (like the OWID file) are
+    not copied.
+    """
+    codes = pd.factorize(df[column])[0]
+    dates = df[DATE_COLUMN].to_numpy() if DATE_COLUMN in df.columns else None
+    grouped = bool(np.all(codes[1:] >= codes[:-1]))
+    if grouped and dates is not None:
+        same = codes[1:] == codes[:-1]
+        grouped = bool(np.all(dates[1:][same] >= dates[:-1][same]))
+    if not grouped:
+        df = df.sort_values([column, DATE_COLUMN] if dates is not None else [column], kind='stable')
+        codes = pd.factorize(df[column])[0]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(df) else np.array([], dtype=int)
+    counts = np.diff(np.r_[starts, len(df)])
+    values = df[column].iloc[starts]
+    return df, {str(value): [int(start), int(count)] for value, start, count in zip(values, starts, counts)}
+
+
+def _write_partitioned_csv(df, path, column):
+    """Write df (already grouped by column) as CSV; return the byte range of every value"""
+    byte_ranges = {}
+    with open(path, 'w', newline='') as f:
+        f.write(','.join(df.columns) + '\n')
+        for value, group in df.groupby(column, sort=False, observed=True):
+            start = f.tell()
+            group.to_csv(f, header=False, index=False)
+            byte_ranges[str(value)] = [start, f.tell() - start]
+    return byte_ranges
+
+
+def save_dataset(df, name, partition_by=None):
+    """
+    Save a dataset to the store and return the path of the primary file.
+    String dimensions of df are converted to categoricals in place.
+    partition_by (e.g. 'location') writes the rows grouped by that column and
+    an index for load_partition().
+    """
+    if columnar_available():
+        for col in DICTIONARY_COLUMNS:
+            if col in df.columns and df[col].dtype == object:
+                df[col] = df[col].astype('category')
+        if DATE_COLUMN in df.columns:
+            df[DATE_COLUMN] = pd.to_datetime(df[DATE_COLUMN])
+
+    index = None
+    if partition_by is not None:
+        df, rows = _partition_order(df, partition_by)
+        index = {'partition_by': partition_by, 'rows': rows}
+
+    path = parquet_path(name) if columnar_available() else csv_path(name)
+    write_csv = not columnar_available() or settings.export_csv()
+    if columnar_available():
+        df.to_parquet(path, index=False, row_group_size=ROW_GROUP_SIZE)
+    if write_csv:
+        if index is not None:
+            index['bytes'] = _write_partitioned_csv(df, csv_path(name), partition_by)
+        else:
+            df.to_csv(csv_path(name), index=False)
+
+    if index is not None:
+        index['files'] = {file: _file_signature(file) for file in (parquet_path(name), csv_path(name))
+                          if os.path.exists(file) and (file == path or write_csv)}
+        with open(index_path(name), 'w') as f:
+            json.dump(index, f)
+    elif os.path.exists(index_path(name)):
+        os.remove(index_path(name))
+    return path
+
+
+def _chunk_schema(df):
+    """
+    Arrow schema shared by every chunk of save_dataset_chunks(), from the pandas
+    dtypes of the first one (string dimensions become dictionary columns)
+    """
+    import pyarrow as pa
+    fields = []
+    for col, dtype in df.dtypes.items():
+        if col in DICTIONARY_COLUMNS and dtype == object:
+            arrow_type = pa.dictionary(pa.int32(), pa.string())
+        elif dtype == object:
+            arrow_type = pa.string()
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            arrow_type = pa.timestamp('ns')
+        else:
+            arrow_type = pa.from_numpy_dtype(dtype)
+        fields.append(pa.field(col, arrow_type))
+    return pa.schema(fields)
+
+
+def save_dataset_chunks(chunks, name):
+    """
+    Save a dataset given as an iterable of frames (same columns and dtypes, e.g.
+    a chunked pd.read_csv), writing each chunk before the next one is read, and
+    return the path of the primary file. Memory stays bounded by the chunk size.
+    """
+    if not columnar_available():
+        path = csv_path(name)
+        with open(path, 'w', newline='') as f:
+            for number, chunk in enumerate(chunks):
+                chunk.to_csv(f, header=number == 0, index=False)
+        return path
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    path = parquet_path(name)
+    csv_file = open(csv_path(name), 'w', newline='') if settings.export_csv() else None
+    writer = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                schema = _chunk_schema(chunk)
+                writer = pq.ParquetWriter(path, schema)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            if csv_file is not None:
+                chunk.to_csv(csv_file, header=csv_file.tell() == 0, index=False)
+    finally:
+        if writer is not None:
+            writer.close()
+        if csv_file is not None:
+            csv_file.close()
+    if os.path.exists(index_path(name)):
+        os.remove(index_path(name))
+    return path
+
+
+def dataset_columns(name):
+    """Column names of a stored dataset, read from the file header/schema only"""
+    path = dataset_path(name)
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(path).names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def load_dataset(name, columns=None):
+    """
+    Load a dataset from the store with 'date' parsed as datetime.
+
+    columns is the activity's column manifest: only those columns are read
+    from disk (columns absent from the dataset are skipped, so a manifest may
+    list optional columns). None loads every column.
+    """
+    path = dataset_path(name)
+    available = dataset_columns(name)
+    if columns is not None:
+        columns = [col for col in available if col in set(columns)]
+
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, columns=columns)
+
+    usecols = columns if columns is not None else available
+    dtypes = {col: dtype for col, dtype in CSV_DTYPES.items() if col in usecols}
+    parse_dates = [DATE_COLUMN] if DATE_COLUMN in usecols else False
+    return pd.read_csv(path, usecols=usecols, dtype=dtypes, parse_dates=parse_dates)
+
+
+def _partition_index(name, path):
+    """The partition index of a dataset, if it matches the file at path"""
+    try:
+        with open(index_path(name)) as f:
+            index = json.load(f)
+        if index['files'].get(path) != _file_signature(path):
+            return None
+    except (OSError, ValueError, KeyError):
+        return None
+    return index
+
+
+def _read_parquet_rows(path, start, count, columns):
+    """Read rows [start, start + count) from only the row groups that hold them"""
+    import pyarrow.parquet as pq
+    parquet = pq.ParquetFile(path)
+    groups, first_row, offset = [], 0, 0
+    for group in range(parquet.metadata.num_row_groups):
+        rows = parquet.metadata.row_group(group).num_rows
+        if offset + rows > start and offset < start + count:
+            if not groups:
+                first_row = offset
+            groups.append(group)
+        offset += rows
+    table = parquet.read_row_groups(groups, columns=columns)
+    return table.slice(start - first_row, count).to_pandas()
+
+
+def _read_csv_bytes(path, start, length, columns):
+    """Parse one byte range of a CSV file (plus its header line)"""
+    with open(path, 'rb') as f:
+        header = f.readline()
+        f.seek(start)
+        body = f.read(length)
+    usecols = columns if columns is not None else header.decode().strip().split(',')
+    dtypes = {col: dtype for col, dtype in CSV_DTYPES.items() if col in usecols}
+    parse_dates = [DATE_COLUMN] if DATE_COLUMN in usecols else False
+    return pd.read_csv(io.BytesIO(header + body), usecols=usecols, dtype=dtypes, parse_dates=parse_dates)
+
+
+def load_partition(name, value, columns=None, by='location'):
+    """
+    Load the rows of one location (or other partition value) of a dataset
+    saved with partition_by=by. columns is a manifest as in load_dataset().
+    Without a valid index the whole dataset is loaded and filtered by the
+    by column. An unknown value gives an empty frame.
+    """
+    path = dataset_path(name)
+    index = _partition_index(name, path)
+    if columns is not None:
+        wanted = set(columns) | {by}
+        columns = [col for col in dataset_columns(name) if col in wanted]
+    if index is None or index['partition_by'] != by:
+        df = load_dataset(name, columns=columns)
+        return df[df[by] == value].reset_index(drop=True)
+
+    if path.endswith('.parquet'):
+        start, count = index['rows'].get(value, [0, 0])
+        return _read_parquet_rows(path, start, count, columns)
+    start, length = index['bytes'].get(value, [0, 0])
+    return _read_csv_bytes(path, start, length, columns)
+
+
+def project(df, columns):
+    """
+    Apply a column manifest to a frame that is already in memory (e.g. the
+    shared frame of the in-process runner). Returns a new frame, so callers can
+    add columns without touching the shared one.
+    """
+    wanted = set(columns)
+    return df[[col for col in df.columns if col in wanted]].copy()
@@ -0,0 +1,149 @@
+"""
+Optional dense metric store: one memory-mapped location x date array per metric.
+
+Activity 2 builds it with --tensor (PAI_TENSOR_STORE) next to the processed
+dataset:
+
+    covid_data_tensor/
+        index.json          locations, first date, number of days, metrics,
+                            and the signature of the processed file it mirrors
+        <metric>.npy        float array [location, day], NaN where no record
+        _present.npy        uint8 array [location, day], 1 where a record exists
+
+open_store() maps the arrays without reading them, so opening is near-instant
+and series()/day() return views into the mapped files (no copy, no parsing):
+
+    tensors = tensor.open_store()
+    cases = tensors.series('total_cases', 'India')      # one country, all days
+    world = tensors.day('new_cases', '2021-05-01')      # all locations, one day
+
+The store carries the same source signature as the derived tables (see
+common.derived) and open_store() returns None when it is missing or no longer
+matches the processed dataset, so callers fall back to the long table.
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from common import derived
+
+TENSOR_DIR = 'covid_data_tensor'
+INDEX_FILE = 'index.json'
+PRESENT = '_present'
+
+# Calendar features of the processed dataset are not stored as metrics
+DATE_FEATURES = ['year', 'month', 'quarter', 'day_of_year', 'week_of_year']
+
+
+def _array_path(path, metric):
+    return os.path.join(path, f'{metric}.npy')
+
+
+def metric_columns(df):
+    """Numeric columns of df stored as metrics"""
+    return [col for col in df.select_dtypes(include=[np.number]).columns if col not in DATE_FEATURES]
+
+
+def build(df, path=TENSOR_DIR):
+    """Write the dense store for the processed frame df and return its path"""
+    metrics = metric_columns(df)
+    location_codes, locations = pd.factorize(df['location'])
+    dates = df['date']
+    start = dates.min().normalize()
+    day_codes = ((dates - start) // pd.Timedelta(days=1)).to_numpy()
+    shape = (len(locations), int(day_codes.max()) + 1 if len(df) else 0)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+
+    present = np.lib.format.open_memmap(_array_path(path, PRESENT), mode='w+', dtype='uint8', shape=shape)
+    present[location_codes, day_codes] = 1
+    present.flush()
+    del present
+    for metric in metrics:
+        dtype = 'float32' if df[metric].dtype == 'float32' else 'float64'
+        array = np.lib.format.open_memmap(_array_path(path, metric), mode='w+', dtype=dtype, shape=shape)
+        array[:] = np.nan
+        array[location_codes, day_codes] = df[metric].to_numpy(dtype=dtype, na_value=np.nan)
+        array.flush()
+        del array
+
+    index = {
+        'locations': [str(location) for location in locations],
+        'start_date': start.strftime('%Y-%m-%d'),
+        'days': shape[1],
+        'metrics': metrics,
+        'source': derived.source_signature(),
+    }
+    with open(os.path.join(path, INDEX_FILE), 'w') as f:
+        json.dump(index, f, indent=2)
+    return path
+
+
+class TensorStore:
+    """Read-only view of a dense store; arrays are mapped on first use"""
+
+    def __init__(self, path, index):
+        self.path = path
+        self.metrics = index['metrics']
+        self.locations = index['locations']
+        self.dates = pd.date_range(index['start_date'], periods=index['days'])
+        self._location_rows = {location: row for row, location in enumerate(self.locations)}
+        self._arrays = {}
+
+    def array(self, metric):
+        """The whole location x day array of a metric (memory-mapped)"""
+        if metric not in self._arrays:
+            self._arrays[metric] = np.load(_array_path(self.path, metric), mmap_mode='r')
+        return self._arrays[metric]
+
+    def location_row(self, location):
+        """Row of a location; KeyError if it is not in the store"""
+        return self._location_rows[location]
+
+    def day_column(self, date):
+        """Column of a date; KeyError if it is outside the stored range"""
+        column = (pd.Timestamp(date) - self.dates[0]).days
+        if not 0 <= column < len(self.dates):
+            raise KeyError(date)
+        return column
+
+    def series(self, metric, location):
+        """Daily values of one location (a view, NaN where there is no record)"""
+        return self.array(metric)[self.location_row(location)]
+
+    def day(self, metric, date):
+        """Values of every location on one date (a view, in self.locations order)"""
+        return self.array(metric)[:, self.day_column(date)]
+
+    def frame(self, location, metrics):
+        """Long-format rows of one location (date plus metrics), only days with a record"""
+        row = self.location_row(location)
+        present = self.array(PRESENT)[row].astype(bool)
+        data = {'location': location, 'date': self.dates[present]}
+        for metric in metrics:
+            if metric in self.metrics:
+                data[metric] = self.array(metric)[row][present]
+        return pd.DataFrame(data)
+
+
+def open_store(path=TENSOR_DIR):
+    """The dense store, or None when it is missing or out of date"""
+    try:
+        with open(os.path.join(path, INDEX_FILE)) as f:
+            index = json.load(f)
+        if index['source'] != derived.source_signature():
+            return None
+    except (OSError, ValueError, KeyError):
+        return None
+    return TensorStore(path, index)
+
+
+def dataset_files():
+    """Files and folders of the store (used by 'run.py clean')"""
+    return [TENSOR_DIR]
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+================================================================================
+COVID-19 Data Analysis Project - Pipeline Benchmarks
+================================================================================
+
+Times the core computations of the activities on synthetic OWID-shaped
+datasets (see synthetic_data.py) at several scales, so the cost of a change
+can be measured before the real dataset grows:
+
+- load_csv             read the raw CSV (Activity 1)
+- missing_scan         per-column missing counts and the >90% drop list (Activity 1)
+- convert_dates        parse the 'date' column (Activity 1)
+- imputation           median/mode imputation of every column (Activity 2)
+- store_write          save the processed dataset to the store (Activity 2)
+- store_read           load a five-column manifest from the store (projected read)
+- daily_table          build the global daily table (common.derived)
+- latest_table         build the latest-per-location table (common.derived)
+
+Every benchmark runs --repeat times and the fastest wall time is kept, together
+with CPU time and the process peak RSS measured by common.profiling. Results
+are written to benchmarks/results/ as JSON and compared with the previous run.
+
+Synthetic datasets are cached in benchmarks/data/ (1x ~ 340k rows, 170 MB CSV;
+100x needs tens of GB of memory for the in-memory stages).
+
+USAGE: python benchmarks/run_benchmarks.py [--scales 1 10 100] [--repeat N]
+                                           [--compare FILE]
+================================================================================
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARKS_DIR), 'activities'))
+from common import derived, imputation, profiling, store
+
+import synthetic_data
+
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, 'results')
+
+DEFAULT_SCALES = [1, 10]
+DEFAULT_REPEAT = 3
+
+# Column manifest used for the projected store read
+STORE_READ_COLUMNS = ['date', 'new_cases', 'new_deaths', 'new_vaccinations', 'new_tests']
+
+BENCHMARK_DATASET = 'benchmark_processed'
+
+
+def timed(name, func, repeat, setup=None):
+    """Run func repeat times inside a profiling stage; return its last result"""
+    result = None
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        with profiling.stage(name):
+            result = func(*args)
+    return result
+
+
+def missing_scan(df):
+    missing_pct = df.isnull().sum() / len(df) * 100
+    return missing_pct[missing_pct > 90].index.tolist()
+
+
+def run_scale(scale, repeat):
+    """Run every benchmark on the dataset of one scale"""
+    path = synthetic_data.ensure_dataset(scale)
+
+    with profiling.activity(f'{scale:g}x'):
+        raw = timed('load_csv', lambda: pd.read_csv(path, low_memory=False), repeat)
+        cols_to_drop = timed('missing_scan', missing_scan, repeat, setup=lambda: (raw,))
+        df = raw.drop(columns=cols_to_drop)
+        del raw
+        df['date'] = timed('convert_dates', pd.to_datetime, repeat, setup=lambda: (df['date'],))
+        timed('imputation', imputation.impute, repeat, setup=lambda: (df.copy(),))
+        imputation.impute(df)
+
+        with tempfile.TemporaryDirectory() as workdir:
+            cwd = os.getcwd()
+            os.chdir(workdir)
+            try:
+                timed('store_write', store.save_dataset, repeat,
+                      setup=lambda: (df.copy(), BENCHMARK_DATASET))
+                file_mb = os.path.getsize(store.dataset_path(BENCHMARK_DATASET)) / 1024 ** 2
+                timed('store_read', store.load_dataset, repeat,
+                      setup=lambda: (BENCHMARK_DATASET, STORE_READ_COLUMNS))
+            finally:
+                os.chdir(cwd)
+
+        timed('daily_table', derived.build_daily, repeat, setup=lambda: (df,))
+        timed('latest_table', derived.build_latest, repeat, setup=lambda: (df,))
+
+    return {
+        'rows': len(df),
+        'locations': int(df['location'].nunique()),
+        'csv_mb': round(os.path.getsize(path) / 1024 ** 2, 1),
+        'store_mb': round(file_mb, 1),
+    }
+
+
+def collect_results(scale_info):
+    """Fastest run (wall and CPU time) and highest peak RSS of every benchmark"""
+    results = {}
+    for r in profiling.records():
+        if r['stage'] == 'total':
+            continue
+        entry = results.setdefault(r['activity'], dict(scale_info[r['activity']], benchmarks={}))
+        peak_mb = round(r['peak_rss_bytes'] / 1024 ** 2, 1) if r['peak_rss_bytes'] else None
+        best = entry['benchmarks'].setdefault(r['stage'], {'wall_s': None, 'cpu_s': None, 'peak_rss_mb': None})
+        if best['wall_s'] is None or r['wall_s'] < best['wall_s']:
+            best['wall_s'] = round(r['wall_s'], 4)
+            best['cpu_s'] = round(r['cpu_s'], 4)
+        if peak_mb is not None:
+            best['peak_rss_mb'] = max(best['peak_rss_mb'] or 0, peak_mb)
+    return results
+
+
+def previous_results_file():
+    files = sorted(glob.glob(os.path.join(RESULTS_DIR, 'bench-*.json')))
+    return files[-1] if files else None
+
+
+def write_results(results, repeat):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    report = {
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'columnar_store': store.columnar_available(),
+        'repeat': repeat,
+        'scales': results,
+    }
+    path = os.path.join(RESULTS_DIR, f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def results_table(results, previous=None):
+    """Results as a text table, with the change against a previous run"""
+    previous_scales = previous['scales'] if previous else {}
+    lines = [f"{'SCALE':<7} {'BENCHMARK':<22} {'WALL (s)':>9} {'CPU (s)':>9} "
+             f"{'PEAK RSS (MB)':>14} {'PREVIOUS (s)':>13} {'CHANGE':>8}",
+             '-' * 88]
+    for scale, entry in results.items():
+        lines.append(f"{scale:<7} {entry['rows']:,} rows, {entry['locations']:,} locations, "
+                     f"{entry['csv_mb']} MB CSV, {entry['store_mb']} MB stored")
+        for name, r in entry['benchmarks'].items():
+            rss = f"{r['peak_rss_mb']:.1f}" if r['peak_rss_mb'] else 'n/a'
+            before = previous_scales.get(scale, {}).get('benchmarks', {}).get(name)
+            if before:
+                change = (r['wall_s'] - before['wall_s']) / before['wall_s'] * 100 if before['wall_s'] else 0.0
+                compare = f"{before['wall_s']:>13.3f} {change:>+7.1f}%"
+            else:
+                compare = f"{'-':>13} {'-':>8}"
+            lines.append(f"{'':<7} {name:<22} {r['wall_s']:>9.3f} {r['cpu_s']:>9.3f} {rss:>14} {compare}")
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline on synthetic OWID-shaped data.')
+    parser.add_argument('--scales', type=float, nargs='+', default=DEFAULT_SCALES,
+                        help='dataset scales relative to the real file (default: 1 10)')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help='runs per benchmark, the fastest is kept (default: 3)')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='results file to compare with (default: the latest in benchmarks/results/)')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("PIPELINE BENCHMARKS")
+    print("=" * 70)
+
+    previous_file = args.compare or previous_results_file()
+    previous = None
+    if previous_file:
+        with open(previous_file) as f:
+            previous = json.load(f)
+
+    profiling.enable()
+    scale_info = {}
+    try:
+        for scale in args.scales:
+            print(f"\n[*] Scale {scale:g}x")
+            scale_info[f'{scale:g}x'] = run_scale(scale, args.repeat)
+            print(f"[OK] Scale {scale:g}x done")
+    finally:
+        profiling.disable()
+
+    results = collect_results(scale_info)
+    print()
+    print(results_table(results, previous))
+    if previous_file:
+        print(f"Compared with: {previous_file}")
+    print(f"[OK] Results saved to: {write_results(results, args.repeat)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Synthetic OWID-shaped COVID-19 datasets for the benchmarks.
+
+generate() writes a CSV with the same columns as data/owid-covid-data.csv:
+one row per location and date, wave-shaped daily series with their cumulative,
+smoothed and per-capita variants, per-location constants (population, smokers,
+hospital beds, ...), OWID aggregate rows (World, continents, income groups with
+OWID_* iso codes) and realistic missing-value ratios.
+
+Scale 1 is roughly the size of the real file (~255 locations x ~1,400 days);
+scale N multiplies the number of countries, like appending sub-national data.
+The CSV is written in batches of locations, so generation needs little memory
+even at 100x.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+BASE_COUNTRIES = 230
+DAYS = 1400
+START_DATE = '2020-01-01'
+BATCH_LOCATIONS = 50
+
+CONTINENTS = ['Africa', 'Asia', 'Europe', 'North America', 'Oceania', 'South America']
+
+AGGREGATES = [
+    ('OWID_WRL', 'World'), ('OWID_AFR', 'Africa'), ('OWID_ASI', 'Asia'),
+    ('OWID_EUR', 'Europe'), ('OWID_NAM', 'North America'), ('OWID_OCE', 'Oceania'),
+    ('OWID_SAM', 'South America'), ('OWID_EUN', 'European Union'),
+    ('OWID_HIC', 'High income'), ('OWID_UMC', 'Upper middle income'),
+    ('OWID_LMC', 'Lower middle income'), ('OWID_LIC', 'Low income'),
+    ('OWID_INT', 'International'),
+]
+
+# Daily metrics: (column, share of leading days missing per location)
+DAILY_COLUMNS = [
+    ('new_cases', 0.03), ('new_deaths', 0.08), ('icu_patients', 0.85),
+    ('hosp_patients', 0.83), ('weekly_icu_admissions', 0.96), ('weekly_hosp_admissions', 0.93),
+    ('new_tests', 0.65), ('new_vaccinations', 0.80), ('new_people_vaccinated', 0.80),
+    ('excess_mortality', 0.97),
+]
+
+# Per-location constants: (column, low, high, share of locations missing)
+STATIC_COLUMNS = [
+    ('population_density', 1, 8000, 0.10), ('median_age', 15, 48, 0.20),
+    ('aged_65_older', 1, 28, 0.22), ('aged_70_older', 0.5, 18, 0.21),
+    ('gdp_per_capita', 600, 120000, 0.22), ('extreme_poverty', 0.1, 78, 0.50),
+    ('cardiovasc_death_rate', 80, 720, 0.21), ('diabetes_prevalence', 1, 31, 0.16),
+    ('female_smokers', 0.1, 45, 0.40), ('male_smokers', 7, 77, 0.41),
+    ('handwashing_facilities', 1, 100, 0.61), ('hospital_beds_per_thousand', 0.1, 14, 0.33),
+    ('life_expectancy', 53, 86, 0.08), ('human_development_index', 0.39, 0.96, 0.24),
+]
+
+# Column order of the OWID file
+COLUMNS = [
+    'iso_code', 'continent', 'location', 'date', 'total_cases', 'new_cases',
+    'new_cases_smoothed', 'total_deaths', 'new_deaths', 'new_deaths_smoothed',
+    'total_cases_per_million', 'new_cases_per_million', 'new_cases_smoothed_per_million',
+    'total_deaths_per_million', 'new_deaths_per_million', 'new_deaths_smoothed_per_million',
+    'reproduction_rate', 'icu_patients', 'icu_patients_per_million', 'hosp_patients',
+    'hosp_patients_per_million', 'weekly_icu_admissions', 'weekly_icu_admissions_per_million',
+    'weekly_hosp_admissions', 'weekly_hosp_admissions_per_million', 'total_tests', 'new_tests',
+    'total_tests_per_thousand', 'new_tests_per_thousand', 'new_tests_smoothed',
+    'new_tests_smoothed_per_thousand', 'positive_rate', 'tests_per_case', 'tests_units',
+    'total_vaccinations', 'people_vaccinated', 'people_fully_vaccinated', 'total_boosters',
+    'new_vaccinations', 'new_vaccinations_smoothed', 'total_vaccinations_per_hundred',
+    'people_vaccinated_per_hundred', 'people_fully_vaccinated_per_hundred',
+    'total_boosters_per_hundred', 'new_vaccinations_smoothed_per_million',
+    'new_people_vaccinated_smoothed', 'new_people_vaccinated_smoothed_per_hundred',
+    'stringency_index', 'population_density', 'median_age', 'aged_65_older', 'aged_70_older',
+    'gdp_per_capita', 'extreme_poverty', 'cardiovasc_death_rate', 'diabetes_prevalence',
+    'female_smokers', 'male_smokers', 'handwashing_facilities', 'hospital_beds_per_thousand',
+    'life_expectancy', 'human_development_index', 'population',
+    'excess_mortality_cumulative_absolute', 'excess_mortality_cumulative', 'excess_mortality',
+    'excess_mortality_cumulative_per_million',
+]
+
+
+def dataset_path(scale):
+    return os.path.join(DATA_DIR, f'owid-synthetic-{scale:g}x.csv')
+
+
+def locations(scale):
+    """(iso_code, continent, location) of every location at a scale"""
+    n_countries = max(1, int(round(BASE_COUNTRIES * scale)))
+    countries = [(f'C{i:05d}', CONTINENTS[i % len(CONTINENTS)], f'Country {i:05d}')
+                 for i in range(n_countries)]
+    aggregates = [(iso, None, name) for iso, name in AGGREGATES]
+    return countries + aggregates
+
+
+def _smooth(values):
+    """7-day trailing mean along the date axis (NaN-aware)"""
+    return pd.DataFrame(values.T).rolling(7, min_periods=1).mean().to_numpy().T
+
+
+def _leading_missing(rng, n_locations, days, share):
+    """Mask hiding the first ~share of days of every location"""
+    starts = np.clip(rng.normal(share, 0.1, n_locations), 0, 1) * days
+    return np.arange(days)[None, :] < starts[:, None]
+
+
+def _source_column(col):
+    """Daily series whose reporting gaps a derived column inherits"""
+    if col.startswith(('total_cases', 'new_cases', 'stringency_index')):
+        return 'new_cases'
+    if col.startswith(('total_tests', 'new_tests', 'positive_rate', 'tests_per_case')):
+        return 'new_tests'
+    if 'vaccin' in col or 'boosters' in col:
+        return 'new_vaccinations'
+    for daily, _ in DAILY_COLUMNS:
+        if col.startswith(daily):
+            return daily
+    return 'new_deaths'
+
+
+def _batch_frame(rng, batch, days, dates):
+    """Long-format frame for one batch of locations"""
+    n = len(batch)
+    t = np.arange(days)[None, :]
+    population = rng.lognormal(15, 1.8, n)[:, None].round()
+
+    # Daily cases: a few Gaussian waves per location plus Poisson noise
+    intensity = np.zeros((n, days))
+    for _ in range(4):
+        centre = rng.uniform(60, days, (n, 1))
+        width = rng.uniform(20, 90, (n, 1))
+        height = rng.lognormal(-8, 1, (n, 1)) * population
+        intensity += height * np.exp(-0.5 * ((t - centre) / width) ** 2)
+    daily = {
+        'new_cases': rng.poisson(intensity).astype(float),
+        'new_tests': rng.poisson(intensity * rng.uniform(5, 40, (n, 1))).astype(float),
+        'new_vaccinations': rng.poisson(population * 0.002 * (t > 340)).astype(float),
+        'excess_mortality': rng.normal(10, 15, (n, days)),
+    }
+    daily['new_deaths'] = rng.binomial(daily['new_cases'].astype(np.int64), 0.012).astype(float)
+    daily['icu_patients'] = _smooth(daily['new_cases']) * 0.05
+    daily['hosp_patients'] = _smooth(daily['new_cases']) * 0.2
+    daily['weekly_icu_admissions'] = daily['icu_patients'] * 0.7
+    daily['weekly_hosp_admissions'] = daily['hosp_patients'] * 0.7
+    daily['new_people_vaccinated'] = daily['new_vaccinations'] * 0.4
+
+    missing = {col: _leading_missing(rng, n, days, share) for col, share in DAILY_COLUMNS}
+    per_million = 1e6 / population
+    per_thousand = 1e3 / population
+    per_hundred = 1e2 / population
+
+    cols = {}
+    cols['total_cases'] = np.cumsum(daily['new_cases'], axis=1)
+    cols['new_cases'] = daily['new_cases']
+    cols['new_cases_smoothed'] = _smooth(daily['new_cases'])
+    cols['total_deaths'] = np.cumsum(daily['new_deaths'], axis=1)
+    cols['new_deaths'] = daily['new_deaths']
+    cols['new_deaths_smoothed'] = _smooth(daily['new_deaths'])
+    for name in ['total_cases', 'new_cases', 'new_cases_smoothed',
+                 'total_deaths', 'new_deaths', 'new_deaths_smoothed']:
+        cols[f'{name}_per_million'] = cols[name] * per_million
+    cols['reproduction_rate'] = np.clip(rng.normal(1.0, 0.25, (n, days)), 0, None)
+    for name in ['icu_patients', 'hosp_patients', 'weekly_icu_admissions', 'weekly_hosp_admissions']:
+        cols[name] = daily[name]
+        cols[f'{name}_per_million'] = daily[name] * per_million
+    cols['total_tests'] = np.cumsum(daily['new_tests'], axis=1)
+    cols['new_tests'] = daily['new_tests']
+    cols['total_tests_per_thousand'] = cols['total_tests'] * per_thousand
+    cols['new_tests_per_thousand'] = daily['new_tests'] * per_thousand
+    cols['new_tests_smoothed'] = _smooth(daily['new_tests'])
+    cols['new_tests_smoothed_per_thousand'] = cols['new_tests_smoothed'] * per_thousand
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cols['positive_rate'] = np.clip(cols['new_cases_smoothed'] / cols['new_tests_smoothed'], 0, 1)
+        cols['tests_per_case'] = cols['new_tests_smoothed'] / cols['new_cases_smoothed']
+    cols['total_vaccinations'] = np.cumsum(daily['new_vaccinations'], axis=1)
+    cols['people_vaccinated'] = np.cumsum(daily['new_people_vaccinated'], axis=1)
+    cols['people_fully_vaccinated'] = cols['people_vaccinated'] * 0.9
+    cols['total_boosters'] = cols['total_vaccinations'] * 0.2
+    cols['new_vaccinations'] = daily['new_vaccinations']
+    cols['new_vaccinations_smoothed'] = _smooth(daily['new_vaccinations'])
+    for name in ['total_vaccinations', 'people_vaccinated', 'people_fully_vaccinated', 'total_boosters']:
+        cols[f'{name}_per_hundred'] = cols[name] * per_hundred
+    cols['new_vaccinations_smoothed_per_million'] = cols['new_vaccinations_smoothed'] * per_million
+    cols['new_people_vaccinated_smoothed'] = _smooth(daily['new_people_vaccinated'])
+    cols['new_people_vaccinated_smoothed_per_hundred'] = cols['new_people_vaccinated_smoothed'] * per_hundred
+    cols['stringency_index'] = np.clip(rng.normal(50, 20, (n, days)), 0, 100).round(2)
+    cols['excess_mortality'] = daily['excess_mortality']
+    cols['excess_mortality_cumulative'] = np.cumsum(daily['excess_mortality'], axis=1) / 100
+    cols['excess_mortality_cumulative_absolute'] = cols['excess_mortality_cumulative'] * population / 1e3
+    cols['excess_mortality_cumulative_per_million'] = cols['excess_mortality_cumulative_absolute'] * per_million
+
+    # Derived columns share the missing-value pattern of their source series
+    for col, values in cols.items():
+        values[missing[_source_column(col)]] = np.nan
+
+    frame = {
+        'iso_code': np.repeat([iso for iso, _, _ in batch], days),
+        'continent': np.repeat([continent for _, continent, _ in batch], days),
+        'location': np.repeat([name for _, _, name in batch], days),
+        'date': np.tile(dates, n),
+    }
+    frame.update({col: values.ravel() for col, values in cols.items()})
+    for col, low, high, share in STATIC_COLUMNS:
+        values = rng.uniform(low, high, n)
+        values[rng.random(n) < share] = np.nan
+        frame[col] = np.repeat(values, days)
+    frame['population'] = np.repeat(population[:, 0], days)
+    frame['tests_units'] = np.where(np.isnan(frame['new_tests']), None, 'tests performed')
+    return pd.DataFrame(frame)[COLUMNS]
+
+
+def generate(path, scale=1.0, days=DAYS, seed=0):
+    """Write a synthetic dataset at the given scale to path and return the row count"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(START_DATE, periods=days).strftime('%Y-%m-%d').to_numpy()
+    all_locations = locations(scale)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    rows = 0
+    for start in range(0, len(all_locations), BATCH_LOCATIONS):
+        batch = all_locations[start:start + BATCH_LOCATIONS]
+        frame = _batch_frame(rng, batch, days, dates)
+        frame.to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+        rows += len(frame)
+    return rows
+
+
+def ensure_dataset(scale, days=DAYS):
+    """Path of the cached synthetic dataset for a scale, generating it if needed"""
+    path = dataset_path(scale)
+    if not os.path.exists(path):
+        print(f"[*] Generating synthetic dataset at {scale:g}x: {path}")
+        rows = generate(path, scale, days)
+        print(f"[OK] {rows:,} rows written ({os.path.getsize(path) / 1024 ** 2:.1f} MB)")
+    return path
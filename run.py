@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 COVID-19 Activities Runner (npm-style)
-Usage: python run.py <command>
+Usage: python run.py <command> [options]
 
 Commands:
   activity1    - Run Activity 1: Data Loading and Basic Analysis
@@ -11,17 +11,96 @@ Commands:
   activity5    - Run Activity 5: Time Series Analysis
   activity6    - Run Activity 6: Country Analysis
   activity7    - Run Activity 7: Summary Dashboard
-  all          - Run all activities in sequence
+  all          - Run all activities in sequence (in-process: the dataset is
+                 loaded once and passed from activity to activity). Activities
+                 whose inputs are unchanged since their last run are skipped
+  profile      - Run all activities in-process with per-stage profiling; prints a
+                 wall time / CPU time / peak RSS table and writes profile_report.json
+  query        - Load the processed dataset once and answer country queries at a
+                 prompt: '<location> [total_cases|total_deaths]' saves a chart
+  serve        - Same queries over HTTP (see --host/--port): /countries,
+                 /series?location=..&metric=.. (JSON), /chart?location=..&metric=.. (PNG)
   setup        - Setup virtual environment and install dependencies
   clean        - Clean all generated images and processed data
   help         - Show this help message
+
+Activity output is forwarded line by line, prefixed with the activity and a
+timestamp, e.g. "[A3 14:02:11] ...".
+
+Options:
+  --jobs N     - Run independent activities (3-7) concurrently on N worker
+                 processes; each activity's output is printed when it finishes
+  --force      - Re-run every activity, even when its inputs are unchanged
+  --incremental
+               - When the raw OWID file changed, merge only its new/changed/removed
+                 (location, date) rows into the processed dataset and derived tables
+                 instead of re-running Activities 1-2 (full rebuild when the schema
+                 or the --impute/--compact settings changed; ignored with --force)
+  --subprocess - Run each activity in its own Python process instead of
+                 importing it into this one
+  --log-dir [DIR]
+               - Also write each activity's output to rotating log files
+                 DIR/activityN.log (default DIR: logs)
+  --csv        - Also export covid_data_cleaned.csv / covid_data_processed.csv
+                 (intermediate datasets are stored as Parquet when pyarrow is installed)
+  --compact    - Keep datasets in compact dtypes: int32/float32 metrics and
+                 categorical strings, wherever no value changes
+  --chunksize N
+               - Activity 1 streams the raw CSV N rows at a time: missing counts,
+                 record counts and the drop list are accumulated per chunk and the
+                 cleaned dataset is written chunk by chunk (bounded memory)
+  --tensor     - Activity 2 also writes covid_data_tensor/: one memory-mapped
+                 location x date array per metric (used by Activity 6)
+  --countries LIST
+               - Activity 6 batch mode: charts 6.1 and 6.3 for comma-separated
+                 locations (or 'all'), rendered on a process pool
+  --batch-jobs N
+               - Worker processes of the batch mode (default: CPU count)
+  --render-jobs N
+               - Worker processes that encode and write figures in the background
+                 while the activity continues (0: save synchronously; default:
+                 up to 4, one CPU fewer than available)
+  --render PROFILE
+               - Figure quality: draft (72 dpi PNG, no tight bbox), screen (100 dpi),
+                 publication (300 dpi, default) or vector (SVG)
+  --no-plots   - Run every computation and text summary but create no figures
+                 (matplotlib and seaborn are then never imported)
+  --density    - Draw Activity 7's positivity vs tests scatter (7.2) as a fixed-size
+                 log-x grid colored by mean total cases per bin
+  --outliers N - With --density, overlay up to N sampled rows from sparse bins
+  --host HOST, --port PORT
+               - Address of 'serve' (default 127.0.0.1:8000)
+  --impute STRATEGY
+               - Missing-value strategy of Activity 2: median (default),
+                 location_median, ffill or interpolate (per location, over time)
 """
 
 import sys
 import os
+import argparse
+import contextlib
+import importlib.util
+import io
+import time
 import subprocess
+import traceback
 import shutil
 from pathlib import Path
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'activities'))
+from common import charts, derived, fingerprint, incremental, profiling, query, runlog, settings, store, tensor
+
+TOTAL_ACTIVITIES = 7
+
+# Activity dependency graph: which activity's output each activity reads
+# (None = raw OWID data). 1 -> 2 -> {3, 4, 5, 6, 7}
+ACTIVITY_INPUTS = {1: None, 2: 1, 3: 2, 4: 2, 5: 2, 6: 2, 7: 2}
+
+RAW_DATA_FILE = "data/owid-covid-data.csv"
+
+# Datasets an activity writes besides its images folder
+ACTIVITY_DATASETS = {1: store.CLEANED_DATASET, 2: store.PROCESSED_DATASET}
 
 def run_command(cmd, description=""):
     """Run a system command and handle errors"""
@@ -107,47 +186,255 @@ def clean_outputs():
             shutil.rmtree(folder)
             print(f"  [OK] Removed {folder}/")
     
+    # Remove charts saved by the query prompt
+    if os.path.exists(query.OUTPUT_DIR):
+        shutil.rmtree(query.OUTPUT_DIR)
+        print(f"  [OK] Removed {query.OUTPUT_DIR}/")
+    
+    # Remove profiling report
+    if os.path.exists(profiling.DEFAULT_REPORT_FILE):
+        os.remove(profiling.DEFAULT_REPORT_FILE)
+        print(f"  [OK] Removed {profiling.DEFAULT_REPORT_FILE}")
+    
+    # Remove activity logs
+    if os.path.exists(runlog.DEFAULT_LOG_DIR):
+        shutil.rmtree(runlog.DEFAULT_LOG_DIR)
+        print(f"  [OK] Removed {runlog.DEFAULT_LOG_DIR}/")
+    
     # Remove processed data files
-    data_files = ['covid_data_cleaned.csv', 'covid_data_processed.csv']
+    data_files = (store.dataset_files(store.CLEANED_DATASET) + store.dataset_files(store.PROCESSED_DATASET)
+                  + derived.dataset_files() + tensor.dataset_files() + incremental.dataset_files())
     for file in data_files:
-        if os.path.exists(file):
+        if os.path.isdir(file):
+            shutil.rmtree(file)
+            print(f"  [OK] Removed {file}/")
+        elif os.path.exists(file):
             os.remove(file)
             print(f"  [OK] Removed {file}")
     
     print("[OK] Cleanup complete!")
 
-def run_activity(activity_num):
+def activity_file(activity_num):
+    return f"activities/activity-{activity_num}/activity-{activity_num}.py"
+
+def output_folder(activity_num):
+    return f"activity{activity_num}_images"
+
+def activity_fingerprints():
+    """Input fingerprint of every activity, chained along the dependency graph"""
+    common = fingerprint.common_digest()
+    fingerprints = {}
+    for num in sorted(ACTIVITY_INPUTS):  # dependencies have lower numbers
+        dependency = ACTIVITY_INPUTS[num]
+        if dependency is None:
+            data = fingerprint.file_digest(RAW_DATA_FILE)
+        else:
+            data = fingerprints[dependency]['digest']
+        fingerprints[num] = fingerprint.compute(activity_file(num), data, common)
+    return fingerprints
+
+def record_fingerprint(activity_num, fingerprints):
+    """Remember the inputs an activity's current outputs were produced from"""
+    datasets = store.dataset_files(ACTIVITY_DATASETS[activity_num]) if activity_num in ACTIVITY_DATASETS else []
+    if ACTIVITY_DATASETS.get(activity_num) == derived.SOURCE_DATASET:
+        datasets += derived.dataset_files() + incremental.dataset_files()
+    fingerprint.record(output_folder(activity_num), fingerprints[activity_num], datasets)
+
+def load_activity_module(activity_num):
+    """Import an activity script as a module (file names are not valid module names)"""
+    spec = importlib.util.spec_from_file_location(f"activity_{activity_num}", activity_file(activity_num))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def run_activity_in_process(activity_num, df=None):
+    """
+    Call an activity's main() in this interpreter and wait for its figures.
+    Returns (success, DataFrame returned by main()).
+    """
+    try:
+        module = load_activity_module(activity_num)
+        result = module.main() if df is None else module.main(df)
+        return charts.wait(), result
+    except Exception:
+        traceback.print_exc()
+        charts.wait()
+        return False, None
+    finally:
+        # Activities share one pyplot state here; drop any figure left open
+        if 'matplotlib.pyplot' in sys.modules:
+            sys.modules['matplotlib.pyplot'].close('all')
+
+def execute_activity(activity_num, writer, isolated=False, df=None):
+    """
+    Run one activity with its output sent to writer (a runlog.LineWriter).
+    Returns (success, DataFrame returned by main() or None).
+    """
+    if isolated:
+        return runlog.stream_command(f"python {activity_file(activity_num)}", writer), None
+    with contextlib.redirect_stdout(writer), contextlib.redirect_stderr(writer):
+        return run_activity_in_process(activity_num, df)
+
+def invalidate_fingerprints(activity_num):
+    """
+    Forget the recorded fingerprints of an activity and of every activity that
+    depends on it, directly or not: it is about to rewrite outputs outside
+    'run.py all', so they no longer match what was recorded
+    """
+    stale = {activity_num}
+    for num in sorted(ACTIVITY_INPUTS):  # dependencies have lower numbers
+        if ACTIVITY_INPUTS[num] in stale:
+            stale.add(num)
+    for num in sorted(stale):
+        fingerprint.invalidate(output_folder(num))
+
+def run_activity(activity_num, isolated=False, log_dir=None):
     """Run a specific activity"""
-    activity_file = f"activities/activity-{activity_num}/activity-{activity_num}.py"
-    
-    if not os.path.exists(activity_file):
-        print(f"[ERROR] Activity {activity_num} not found: {activity_file}")
+    if not os.path.exists(activity_file(activity_num)):
+        print(f"[ERROR] Activity {activity_num} not found: {activity_file(activity_num)}")
         return False
     
     print("=" * 60)
     print(f"RUNNING ACTIVITY {activity_num}")
     print("=" * 60)
     
-    return run_command(f"python {activity_file}", f"Activity {activity_num}")
+    invalidate_fingerprints(activity_num)
+    with runlog.activity_output(activity_num, log_dir=log_dir) as writer:
+        success, _ = execute_activity(activity_num, writer, isolated)
+    return success
 
-def run_all_activities():
-    """Run all activities in sequence"""
-    print("=" * 60)
-    print("RUNNING ALL COVID-19 ACTIVITIES")
-    print("=" * 60)
+def run_activities_in_sequence(fingerprints, up_to_date, isolated=False, log_dir=None):
+    """Run all activities one after another; returns {activity_num: success}"""
+    results = {}
+    outputs = {}
     
-    success_count = 0
-    total_activities = 7
-    
-    for i in range(1, total_activities + 1):
+    for i in range(1, TOTAL_ACTIVITIES + 1):
         print(f"\n{'='*20} ACTIVITY {i} {'='*20}")
-        if run_activity(i):
-            success_count += 1
+        if i in up_to_date:
+            print(f"[SKIP] Activity {i} is up to date (inputs unchanged, use --force to re-run)")
+            results[i] = True
+            continue
+        
+        # In-process, hand the previous activity's DataFrame over instead of reloading it
+        with runlog.activity_output(i, log_dir=log_dir) as writer:
+            success, outputs[i] = execute_activity(i, writer, isolated, outputs.get(ACTIVITY_INPUTS[i]))
+        
+        results[i] = success
+        if success:
+            record_fingerprint(i, fingerprints)
             print(f"[OK] Activity {i} completed successfully!")
         else:
             print(f"[ERROR] Activity {i} failed!")
             print("Continuing with next activity...")
     
+    return results
+
+def _run_activity_job(activity_num, isolated, log_dir):
+    """
+    Process pool worker: run one activity with its output captured.
+    Returns (activity_num, success, output, elapsed seconds).
+    """
+    start = time.perf_counter()
+    buffer = io.StringIO()
+    with runlog.activity_output(activity_num, out=buffer, log_dir=log_dir) as writer:
+        success, _ = execute_activity(activity_num, writer, isolated)
+    return activity_num, success, buffer.getvalue(), time.perf_counter() - start
+
+def run_activity_graph(jobs, fingerprints, up_to_date, isolated=False, log_dir=None):
+    """
+    Run the activity graph on a pool of `jobs` processes. An activity starts as
+    soon as the activity it depends on has succeeded, so 3-7 run concurrently.
+    Each activity reads its input from the dataset store and its output is
+    printed in one block when it finishes. Returns {activity_num: success}.
+    """
+    results = {}
+    remaining = set(ACTIVITY_INPUTS)
+    running = {}
+    
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while remaining or running:
+            for num in sorted(remaining):
+                dependency = ACTIVITY_INPUTS[num]
+                if num in up_to_date and results.get(dependency, True) is True:
+                    print(f"[SKIP] Activity {num} is up to date (inputs unchanged, use --force to re-run)")
+                    results[num] = True
+                    remaining.discard(num)
+                elif dependency is None or results.get(dependency) is True:
+                    print(f">> Starting activity {num}")
+                    running[pool.submit(_run_activity_job, num, isolated, log_dir)] = num
+                    remaining.discard(num)
+                elif results.get(dependency) is False:
+                    print(f"[ERROR] Activity {num} skipped: activity {dependency} failed")
+                    results[num] = False
+                    remaining.discard(num)
+            
+            if not running:
+                break
+            
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                num = running.pop(future)
+                try:
+                    _, success, output, elapsed = future.result()
+                except Exception as e:
+                    success, output, elapsed = False, f"[ERROR] Worker crashed: {e}\n", 0.0
+                
+                print(f"\n{'='*20} ACTIVITY {num} {'='*20}")
+                print(output, end='')
+                results[num] = success
+                if success:
+                    record_fingerprint(num, fingerprints)
+                    print(f"[OK] Activity {num} completed successfully! ({elapsed:.1f}s)")
+                else:
+                    print(f"[ERROR] Activity {num} failed! ({elapsed:.1f}s)")
+    
+    return results
+
+def run_incremental_update(fingerprints):
+    """
+    Merge the changes of the raw file into the store in place of Activities 1-2.
+    Returns True when they are now up to date, False when they need a full run.
+    """
+    print(f"\n{'='*20} INCREMENTAL UPDATE (ACTIVITIES 1-2) {'='*20}")
+    try:
+        merged = incremental.update(RAW_DATA_FILE)
+    except FileNotFoundError as e:
+        print(f"[ERROR] {e}")
+        return False
+    except Exception:
+        traceback.print_exc()
+        print("[ERROR] Incremental update failed, running Activities 1-2 in full")
+        return False
+    if merged is None:
+        print("[*] Running Activities 1-2 in full")
+        return False
+    record_fingerprint(1, fingerprints)
+    record_fingerprint(2, fingerprints)
+    return True
+
+def run_all_activities(isolated=False, jobs=1, force=False, log_dir=None, incremental_update=False):
+    """Run all activities, in sequence or as a parallel graph when jobs > 1"""
+    print("=" * 60)
+    print("RUNNING ALL COVID-19 ACTIVITIES")
+    print("=" * 60)
+    
+    total_activities = TOTAL_ACTIVITIES
+    fingerprints = activity_fingerprints()
+    up_to_date = set() if force else {
+        num for num, fp in fingerprints.items()
+        if fingerprint.is_up_to_date(output_folder(num), fp)
+    }
+    if incremental_update and not force and not {1, 2} <= up_to_date:
+        if run_incremental_update(fingerprints):
+            up_to_date |= {1, 2}
+    
+    if jobs > 1:
+        print(f"[OK] Running independent activities on {jobs} worker processes")
+        results = run_activity_graph(jobs, fingerprints, up_to_date, isolated, log_dir)
+    else:
+        results = run_activities_in_sequence(fingerprints, up_to_date, isolated, log_dir)
+    success_count = sum(1 for success in results.values() if success)
+    
     print("\n" + "=" * 60)
     print("FINAL SUMMARY")
     print("=" * 60)
@@ -157,35 +444,98 @@ def run_all_activities():
         print("*** ALL ACTIVITIES COMPLETED SUCCESSFULLY! ***")
         print("\nGenerated folders:")
         for i in range(1, total_activities + 1):
-            folder = f"activity{i}_images"
+            folder = output_folder(i)
             if os.path.exists(folder):
                 file_count = len([f for f in os.listdir(folder) if f.endswith('.png')])
                 print(f"  >> {folder}/ ({file_count} images)")
     else:
         print(f"[WARNING] {total_activities - success_count} activities had issues")
 
+def profile_activities(log_dir=None):
+    """Run all activities in-process with stage profiling and report the results"""
+    print("=" * 60)
+    print("PROFILING ALL COVID-19 ACTIVITIES")
+    print("=" * 60)
+    
+    results = {}
+    outputs = {}
+    invalidate_fingerprints(1)
+    profiling.enable()
+    try:
+        for i in range(1, TOTAL_ACTIVITIES + 1):
+            print(f"\n{'='*20} ACTIVITY {i} {'='*20}")
+            with runlog.activity_output(i, log_dir=log_dir) as writer, profiling.activity(f"activity{i}"):
+                results[i], outputs[i] = execute_activity(i, writer, df=outputs.get(ACTIVITY_INPUTS[i]))
+            if not results[i]:
+                print(f"[ERROR] Activity {i} failed!")
+    finally:
+        profiling.disable()
+    
+    report_file = profiling.write_report()
+    print("\n" + "=" * 60)
+    print("PROFILE SUMMARY")
+    print("=" * 60)
+    print(profiling.summary_table())
+    print(f"[OK] Profile report saved: {report_file}")
+
+def start_query(http=False, host=query.DEFAULT_HOST, port=query.DEFAULT_PORT):
+    """Load the processed dataset once, then answer queries at a prompt or over HTTP"""
+    start = time.time()
+    try:
+        country_query = query.CountryQuery()
+    except FileNotFoundError:
+        print("[ERROR] covid_data_processed dataset not found!")
+        print("Please run activities 1-2 first.")
+        return
+    country_query.warm_up()
+    print(f"[OK] {len(country_query.locations())} locations loaded in {time.time() - start:.2f}s")
+    if http:
+        query.serve(country_query, host, port)
+    else:
+        query.repl(country_query)
+
 def show_help():
     """Show help message"""
     print(__doc__)
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python run.py <command>")
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('command', nargs='?')
+    parser.add_argument('--subprocess', action='store_true')
+    parser.add_argument('--jobs', type=int, default=1)
+    parser.add_argument('--force', action='store_true')
+    parser.add_argument('--incremental', action='store_true')
+    parser.add_argument('--log-dir', nargs='?', const=runlog.DEFAULT_LOG_DIR, default=None)
+    parser.add_argument('--host', default=query.DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=query.DEFAULT_PORT)
+    settings.add_arguments(parser)
+    if {'-h', '--help'} & set(sys.argv[1:]):
+        show_help()
+        return
+    args, unknown = parser.parse_known_args()
+    
+    if args.command is None or unknown:
+        print("Usage: python run.py <command> [options]")
         print("Run 'python run.py help' for available commands")
         sys.exit(1)
     
-    command = sys.argv[1].lower()
+    command = args.command.lower()
+    settings.apply_arguments(args)
     
     # Command mapping
     commands = {
-        'activity1': lambda: run_activity(1),
-        'activity2': lambda: run_activity(2),
-        'activity3': lambda: run_activity(3),
-        'activity4': lambda: run_activity(4),
-        'activity5': lambda: run_activity(5),
-        'activity6': lambda: run_activity(6),
-        'activity7': lambda: run_activity(7),
-        'all': run_all_activities,
+        'activity1': lambda: run_activity(1, args.subprocess, args.log_dir),
+        'activity2': lambda: run_activity(2, args.subprocess, args.log_dir),
+        'activity3': lambda: run_activity(3, args.subprocess, args.log_dir),
+        'activity4': lambda: run_activity(4, args.subprocess, args.log_dir),
+        'activity5': lambda: run_activity(5, args.subprocess, args.log_dir),
+        'activity6': lambda: run_activity(6, args.subprocess, args.log_dir),
+        'activity7': lambda: run_activity(7, args.subprocess, args.log_dir),
+        'all': lambda: run_all_activities(args.subprocess, args.jobs, args.force, args.log_dir,
+                                          args.incremental),
+        'profile': lambda: profile_activities(args.log_dir),
+        'query': lambda: start_query(),
+        'serve': lambda: start_query(http=True, host=args.host, port=args.port),
         'setup': setup_environment,
         'clean': clean_outputs,
         'help': show_help,
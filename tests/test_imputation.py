@@ -0,0 +1,37 @@
+"""Regression tests for the missing-value imputation of Activity 2 (common.imputation)"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'activities'))
+from common import imputation
+
+
+def _frame():
+    # 'cases' of C is never reported: it takes the global median, which must
+    # be that of the reported values (1, 5, 6), not of A's carried values
+    return pd.DataFrame({
+        'location': ['A', 'A', 'A', 'A', 'B', 'B', 'C'],
+        'date': pd.to_datetime(['2020-01-01', '2020-01-02', '2020-01-03', '2020-01-04',
+                                '2020-01-01', '2020-01-02', '2020-01-01']),
+        'cases': [1.0, np.nan, np.nan, np.nan, 5.0, 6.0, np.nan],
+    })
+
+
+@pytest.mark.parametrize('strategy', ['location_median', 'ffill', 'interpolate'])
+def test_leftovers_take_the_median_of_the_original_data(strategy):
+    df = _frame()
+    stats = imputation.impute(df, strategy)
+    assert stats[0]['fill_value'] == 5.0
+    assert df.loc[df['location'] == 'C', 'cases'].tolist() == [5.0]
+
+
+def test_recorded_fill_values_win():
+    df = _frame()
+    stats = imputation.impute(df, 'ffill', fill_values={'cases': 7.0})
+    assert stats[0]['fill_value'] == 7.0
+    assert df.loc[df['location'] == 'C', 'cases'].tolist() == [7.0]
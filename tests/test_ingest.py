@@ -0,0 +1,36 @@
+"""Regression tests for the chunked ingestion of Activity 1 (common.ingest)"""
+
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'activities'))
+from common import ingest, store
+
+# 'population' is an integer column that is entirely missing in the second
+# chunk of two rows; 'flag' is a bool column in the same situation
+RAW_CSV = (
+    "location,date,population,flag\n"
+    "A,2020-01-01,1,True\n"
+    "A,2020-01-02,2,False\n"
+    "B,2020-01-01,,\n"
+    "B,2020-01-02,,\n"
+)
+
+
+def test_all_missing_chunk_of_integer_column(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / 'owid.csv'
+    path.write_text(RAW_CSV)
+
+    profile = ingest.scan(path, chunksize=2)
+    assert profile.dtypes()['population'] == 'float64'
+    assert profile.dtypes()['flag'] == 'object'
+
+    ingest.write_cleaned(path, profile, drop=[], chunksize=2)
+    cleaned = store.load_dataset(store.CLEANED_DATASET)
+    expected = pd.read_csv(path, parse_dates=['date'])
+    assert cleaned['population'].tolist()[:2] == [1.0, 2.0]
+    assert cleaned['population'].isna().sum() == 2
+    assert len(cleaned) == len(expected)